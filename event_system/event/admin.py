@@ -1,6 +1,20 @@
 from django.contrib import admin
-from .models import Event, Registration
+from .models import AdmissionTicket, Event, Registration, WaitlistEntry
 
 # Register your models here.
 admin.site.register(Event)
-admin.site.register(Registration)
\ No newline at end of file
+admin.site.register(WaitlistEntry)
+
+@admin.register(Registration)
+class RegistrationAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'registration_date')
+    list_filter = ('status',)
+    list_select_related = ('user', 'event')
+    raw_id_fields = ('user', 'event')
+
+
+@admin.register(AdmissionTicket)
+class AdmissionTicketAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'status', 'error', 'created_at')
+    list_filter = ('status',)
+    raw_id_fields = ('user', 'event', 'registration')
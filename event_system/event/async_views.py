@@ -0,0 +1,90 @@
+"""
+Native async read endpoints for the event API.
+
+Under ASGI the DRF views in views.py are run through sync_to_async, which
+funnels every request through a worker thread. These views serve the same
+data with Django's async ORM so a single worker can keep many requests in
+flight. They mirror the sync endpoints' filtering, pagination and payloads;
+the event response cache is left to the sync views.
+"""
+from django.contrib.auth.models import User
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from rest_framework.exceptions import APIException, AuthenticationFailed, NotAuthenticated
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+
+from .authentication import check_user, user_cache
+from .models import Event
+from .pagination import EventCursorPagination
+from .serializers import EventSerializer, RegistrationSerializer, RegistrationWithEventSerializer
+from .views import active_registrations, filter_events
+
+
+async def authenticate(request):
+    """Async counterpart of JWTAuthentication.authenticate."""
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = header and authentication.get_raw_token(header)
+    if not raw_token:
+        raise NotAuthenticated()
+    try:
+        token = authentication.get_validated_token(raw_token)
+        user_id = token[jwt_settings.USER_ID_CLAIM]
+    except (InvalidToken, TokenError, KeyError):
+        raise AuthenticationFailed('Given token not valid for any token type')
+    user = user_cache.get(user_id)
+    if user is None:
+        try:
+            user = await User.objects.aget(**{jwt_settings.USER_ID_FIELD: user_id})
+        except User.DoesNotExist:
+            raise AuthenticationFailed('User not found')
+        check_user(user, token)
+        user_cache.set(user_id, user)
+    else:
+        check_user(user, token)
+    return user
+
+
+def api_view(view):
+    # Render DRF exceptions the way DRF's exception handler would
+    @require_GET
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return await view(Request(request), *args, **kwargs)
+        except APIException as exc:
+            data = exc.detail if isinstance(exc.detail, (dict, list)) else {'detail': exc.detail}
+            response = JsonResponse(data, status=exc.status_code, safe=False)
+            if isinstance(exc, (NotAuthenticated, AuthenticationFailed)):
+                response['WWW-Authenticate'] = JWTAuthentication().authenticate_header(request)
+                response.status_code = 401
+            return response
+    return wrapper
+
+
+@api_view
+async def event_list(request):
+    paginator = EventCursorPagination()
+    page = await paginator.apaginate_queryset(filter_events(request.query_params), request)
+    data = EventSerializer(page, many=True).data
+    return JsonResponse(paginator.get_paginated_data(data))
+
+
+@api_view
+async def event_detail(request, pk):
+    await authenticate(request)
+    event = await Event.objects.filter(pk=pk).afirst()
+    if event is None:
+        return JsonResponse({'detail': 'No Event matches the given query.'}, status=404)
+    return JsonResponse(EventSerializer(event).data)
+
+
+@api_view
+async def registration_list(request):
+    user = await authenticate(request)
+    expand_event = request.query_params.get('expand') == 'event'
+    serializer_class = RegistrationWithEventSerializer if expand_event else RegistrationSerializer
+    registrations = [r async for r in active_registrations(user, expand_event)]
+    return JsonResponse(serializer_class(registrations, many=True).data, safe=False)
@@ -0,0 +1,60 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+CATALOGUE_VERSION_KEY = 'event:catalogue:version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'EVENT_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    # Short unless configured: the default cache is per process
+    return getattr(settings, 'EVENT_CACHE_TIMEOUT', 30)
+
+
+def catalogue_version():
+    cache = get_cache()
+    version = cache.get(CATALOGUE_VERSION_KEY)
+    if version is None:
+        # Start from a fresh value so entries written under an evicted
+        # version can never be served again
+        version = time.time_ns()
+        cache.add(CATALOGUE_VERSION_KEY, version, None)
+        version = cache.get(CATALOGUE_VERSION_KEY, version)
+    return version
+
+
+def list_key(request):
+    # Pagination links are absolute, so the host is part of the key
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    digest = hashlib.md5(f'{request.get_host()}|{params}'.encode()).hexdigest()
+    return f'event:list:{catalogue_version()}:{digest}'
+
+
+def detail_key(pk):
+    return f'event:detail:{pk}'
+
+
+def invalidate_events(pks):
+    cache = get_cache()
+    cache.delete_many([detail_key(pk) for pk in pks])
+    try:
+        cache.incr(CATALOGUE_VERSION_KEY)
+    except ValueError:
+        # Version already gone: the next reader starts a fresh one
+        pass
+
+
+def invalidate_event(pk):
+    invalidate_events([pk])
+
+
+def invalidate_events_on_commit(pks):
+    # For changes made with QuerySet.update(), which sends no post_save
+    pks = list(pks)
+    transaction.on_commit(lambda: invalidate_events(pks))
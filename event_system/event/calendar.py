@@ -0,0 +1,88 @@
+"""
+iCalendar (RFC 5545) output for event feeds.
+
+Everything here works on plain values so the views can stream rows straight
+from a values_list() cursor without building model instances.
+"""
+from datetime import timezone as dt_timezone
+
+from django.core import signing
+from django.utils.crypto import constant_time_compare
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+PRODID = '-//Event System//Event Registrations//EN'
+FEED_KEY_SALT = 'event.calendar-feed'
+RRULE_FREQUENCIES = {'daily': 'DAILY', 'weekly': 'WEEKLY', 'monthly': 'MONTHLY'}
+
+
+def feed_key(user_id, password):
+    # Calendar apps cannot send a JWT, so subscriptions carry a signed user id.
+    # The password digest rides along: changing the password revokes the link.
+    return signing.dumps([user_id, get_md5_hash_password(password)], salt=FEED_KEY_SALT)
+
+
+def read_feed_key(key):
+    """(user_id, password digest) from a subscription key, or None when it is not valid."""
+    try:
+        user_id, digest = signing.loads(key, salt=FEED_KEY_SALT)
+    except (signing.BadSignature, TypeError, ValueError):
+        return None
+    return user_id, digest
+
+
+def key_matches_password(digest, password):
+    return constant_time_compare(digest, get_md5_hash_password(password))
+
+
+def format_datetime(value):
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def escape_text(value):
+    return (value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+
+def fold(line):
+    # Content lines are limited to 75 octets; continuations start with a space
+    data = line.encode()
+    chunks = []
+    while len(data) > 75:
+        cut = 75 if not chunks else 74
+        while cut and (data[cut] & 0xC0) == 0x80:
+            cut -= 1  # never split a UTF-8 sequence
+        chunks.append(data[:cut])
+        data = data[cut:]
+    chunks.append(data)
+    return '\r\n '.join(chunk.decode() for chunk in chunks) + '\r\n'
+
+
+def recurrence_rule(recurrence, interval, until):
+    rule = f'FREQ={RRULE_FREQUENCIES[recurrence]};INTERVAL={interval}'
+    if until:
+        rule += f';UNTIL={format_datetime(until)}'
+    return rule
+
+
+def vevent(uid, start, stamp, title, location, description, rrule=None):
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:{uid}',
+        f'DTSTAMP:{format_datetime(stamp)}',
+        f'DTSTART:{format_datetime(start)}',
+        f'SUMMARY:{escape_text(title)}',
+        f'LOCATION:{escape_text(location)}',
+        f'DESCRIPTION:{escape_text(description)}',
+    ]
+    if rrule:
+        lines.append(f'RRULE:{rrule}')
+    lines.append('END:VEVENT')
+    return ''.join(fold(line) for line in lines)
+
+
+def stream_calendar(name, events):
+    """Yield a VCALENDAR chunk by chunk around an iterable of VEVENT strings."""
+    yield fold('BEGIN:VCALENDAR') + fold('VERSION:2.0') + fold(f'PRODID:{PRODID}') \
+        + fold('CALSCALE:GREGORIAN') + fold(f'X-WR-CALNAME:{escape_text(name)}')
+    yield from events
+    yield fold('END:VCALENDAR')
@@ -0,0 +1,129 @@
+import asyncio
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from event.models import Event, Registration
+
+HOST = 'localhost'
+
+
+async def asgi_get(app, path, query, headers):
+    """Issue one GET against the ASGI application and return the status code."""
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': query.encode(),
+        'root_path': '',
+        'headers': [(b'host', HOST.encode())] + headers,
+        'server': (HOST, 80),
+        'client': ('127.0.0.1', 0),
+    }
+    body_sent = False
+    disconnected = asyncio.Event()
+    response = {}
+
+    async def receive():
+        nonlocal body_sent
+        if not body_sent:
+            body_sent = True
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+        await disconnected.wait()
+        return {'type': 'http.disconnect'}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            response['status'] = message['status']
+
+    await app(scope, receive, send)
+    disconnected.set()
+    return response['status']
+
+
+async def run_load(app, path, query, headers, total, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    errors = 0
+
+    async def one():
+        nonlocal errors
+        async with semaphore:
+            if await asgi_get(app, path, query, headers) != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(total)))
+    return total / (time.perf_counter() - started), errors
+
+
+class Command(BaseCommand):
+    help = ("Compare requests/second of the sync DRF views and the native async "
+            "views when served by a single in-process ASGI worker")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000,
+                            help="Requests per endpoint (default: 1000)")
+        parser.add_argument('--concurrency', type=int, default=50,
+                            help="Requests kept in flight at once (default: 50)")
+        parser.add_argument('--username', help="User to authenticate as (default: first active user)")
+        parser.add_argument('--with-cache', action='store_true',
+                            help="Leave the event response cache on for the sync views")
+
+    def handle(self, *args, **options):
+        event = Event.objects.order_by('pk').first()
+        users = User.objects.filter(is_active=True).order_by('pk')
+        if options['username']:
+            users = users.filter(username=options['username'])
+        user = users.first()
+        if event is None or user is None:
+            raise CommandError("Benchmark needs at least one event and one active user in the database")
+        if not Registration.objects.filter(user=user).exists():
+            self.stderr.write(f"Note: {user.username} has no registrations")
+
+        overrides = {'DEBUG': False, 'ALLOWED_HOSTS': [HOST]}
+        if not options['with_cache']:
+            overrides['CACHES'] = {
+                **settings.CACHES,
+                'benchmark': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            }
+            overrides['EVENT_CACHE_ALIAS'] = 'benchmark'
+
+        auth = [(b'authorization', f'Bearer {AccessToken.for_user(user)}'.encode())]
+        endpoints = [
+            ('event list', '/api/events/', '/api/async/events/', '', []),
+            ('event detail', f'/api/events/{event.pk}/', f'/api/async/events/{event.pk}/', '', auth),
+            ('my registrations', '/api/my-registrations/', '/api/async/my-registrations/',
+             'expand=event', auth),
+        ]
+
+        with override_settings(**overrides):
+            results = asyncio.run(self.run_all(endpoints, options['requests'], options['concurrency']))
+
+        self.stdout.write(f"{options['requests']} requests per endpoint, "
+                          f"concurrency {options['concurrency']}, one ASGI worker\n")
+        self.stdout.write(f"{'endpoint':<18}{'sync req/s':>12}{'async req/s':>13}{'speedup':>10}")
+        for name, (sync_rps, sync_errors), (async_rps, async_errors) in results:
+            self.stdout.write(f"{name:<18}{sync_rps:>12.1f}{async_rps:>13.1f}{async_rps / sync_rps:>9.2f}x")
+            if sync_errors or async_errors:
+                self.stderr.write(f"  non-200 responses: sync={sync_errors} async={async_errors}")
+
+    async def run_all(self, endpoints, total, concurrency):
+        app = get_asgi_application()
+        results = []
+        for name, sync_path, async_path, query, headers in endpoints:
+            # One warm-up request each so connection setup is not measured
+            await asgi_get(app, sync_path, query, headers)
+            await asgi_get(app, async_path, query, headers)
+            sync_result = await run_load(app, sync_path, query, headers, total, concurrency)
+            async_result = await run_load(app, async_path, query, headers, total, concurrency)
+            results.append((name, sync_result, async_result))
+        return results
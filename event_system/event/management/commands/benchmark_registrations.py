@@ -0,0 +1,274 @@
+import json
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from event.models import Event, Registration
+
+PREFIX = 'bench-'
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / 'benchmarks' / 'registration_baseline.json'
+# Metrics compared against the baseline, and whether higher is better
+COMPARED_METRICS = {'throughput': True, 'p95_ms': False, 'queries_per_request': False}
+
+
+class InProcessTransport:
+    """Runs requests through Django's WSGI handler and counts their queries."""
+    counts_queries = True
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def request(self, method, path, token, data=None):
+        client = getattr(self.local, 'client', None)
+        if client is None:
+            client = self.local.client = Client(raise_request_exception=False)
+        queries = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal queries
+            queries += 1
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(count_query):
+            response = getattr(client, method)(path, data, content_type='application/json',
+                                               HTTP_AUTHORIZATION=f'Bearer {token}')
+        body = response.json() if response.get('Content-Type') == 'application/json' else {}
+        return response.status_code, body, queries
+
+
+class HttpTransport:
+    """Sends real HTTP requests to a running server; query counts are unavailable."""
+    counts_queries = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+
+    def request(self, method, path, token, data=None):
+        request = urllib.request.Request(
+            self.base_url + path, method=method.upper(),
+            data=json.dumps(data).encode() if data is not None else None,
+            headers={'Authorization': f'Bearer {token}', 'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read() or b'{}'), None
+        except urllib.error.HTTPError as error:
+            return error.code, {}, None
+
+
+def percentile(samples, pct):
+    return statistics.quantiles(samples, n=100, method='inclusive')[pct - 1] if len(samples) > 1 else samples[0]
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of human-readable regressions of results against baseline."""
+    regressions = []
+    for phase, metrics in results.items():
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            current, previous = metrics.get(metric), baseline.get(phase, {}).get(metric)
+            if current is None or previous is None:
+                continue
+            # Query counts are deterministic, so any increase is a regression
+            allowed = 0 if metric == 'queries_per_request' else tolerance
+            if higher_is_better and current < previous * (1 - allowed):
+                regressions.append(f"{phase} {metric}: {current:.1f} < baseline {previous:.1f}")
+            if not higher_is_better and current > previous * (1 + allowed) + 1e-9:
+                regressions.append(f"{phase} {metric}: {current:.1f} > baseline {previous:.1f}")
+    return regressions
+
+
+class Command(BaseCommand):
+    help = ("Seed benchmark data, drive concurrent registration and cancellation "
+            "traffic, and compare throughput/latency/query counts to a stored baseline")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--events', type=int, default=200, help="Events to seed (default: 200)")
+        parser.add_argument('--users', type=int, default=2000, help="Users to seed (default: 2000)")
+        parser.add_argument('--registrations', type=int, default=10000,
+                            help="Existing registrations to seed (default: 10000)")
+        parser.add_argument('--requests', type=int, default=500,
+                            help="Requests per phase (default: 500)")
+        parser.add_argument('--concurrency', type=int, default=16,
+                            help="Concurrent clients (default: 16)")
+        parser.add_argument('--url', help="Benchmark a running server (e.g. http://localhost:8000) "
+                                          "that uses the same database, instead of the "
+                                          "in-process WSGI handler")
+        parser.add_argument('--baseline', default=str(DEFAULT_BASELINE),
+                            help="Baseline JSON file to compare against")
+        parser.add_argument('--save-baseline', action='store_true',
+                            help="Store this run as the new baseline instead of comparing")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed throughput/p95 regression as a fraction (default: 0.2)")
+        parser.add_argument('--reseed', action='store_true', help="Drop and recreate benchmark data")
+        parser.add_argument('--cleanup', action='store_true',
+                            help="Delete benchmark data and exit")
+        parser.add_argument('--seed', type=int, default=1, help="Random seed (default: 1)")
+
+    def handle(self, *args, **options):
+        if options['cleanup'] or options['reseed']:
+            self.cleanup()
+            if options['cleanup']:
+                return
+        rng = random.Random(options['seed'])
+        self.seed_data(options, rng)
+
+        transport = HttpTransport(options['url']) if options['url'] else InProcessTransport()
+        with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver', 'localhost']):
+            results = self.run_phases(transport, options, rng)
+        self.report(results, options)
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2) + '\n')
+            self.stdout.write(f"Baseline written to {baseline_path}")
+        elif baseline_path.exists():
+            regressions = compare_to_baseline(results, json.loads(baseline_path.read_text()),
+                                              options['tolerance'])
+            if regressions:
+                raise CommandError("Performance regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {baseline_path}"))
+        else:
+            self.stdout.write(f"No baseline at {baseline_path}; run with --save-baseline to store one")
+
+    def cleanup(self):
+        Event.all_objects.filter(title__startswith=PREFIX).delete()
+        User.objects.filter(username__startswith=PREFIX).delete()
+
+    def seed_data(self, options, rng):
+        if Event.objects.filter(title__startswith=PREFIX).exists():
+            return
+        self.stdout.write("Seeding benchmark data...")
+        now = timezone.now()
+        events = Event.objects.bulk_create([
+            Event(title=f'{PREFIX}event-{i}', description='Benchmark event',
+                  date=now + timedelta(days=rng.randint(1, 365)),
+                  location=rng.choice(['Lagos', 'Abuja', 'Accra', 'Nairobi']),
+                  capacity=rng.randint(200, 2000))
+            for i in range(options['events'])
+        ], batch_size=1000)
+        users = User.objects.bulk_create([
+            User(username=f'{PREFIX}user-{i}', password='!') for i in range(options['users'])
+        ], batch_size=1000)
+        # Only the first 80% of users hold seeded registrations; the rest register during the run
+        holders = users[:max(int(len(users) * 0.8), 1)]
+        pairs = set()
+        while len(pairs) < min(options['registrations'], len(holders) * len(events)):
+            pairs.add((rng.choice(holders).pk, rng.choice(events).pk))
+        Registration.objects.bulk_create(
+            [Registration(user_id=user_id, event_id=event_id) for user_id, event_id in pairs],
+            batch_size=5000)
+        call_command('rebuild_seat_counts', stdout=self.stdout)
+
+    def run_phases(self, transport, options, rng):
+        events = list(Event.objects.filter(title__startswith=PREFIX).values_list('pk', flat=True))
+        users = list(User.objects.filter(username__startswith=PREFIX).order_by('pk'))
+        runners = users[max(int(len(users) * 0.8), 1):] or users
+        tokens = {user.pk: str(AccessToken.for_user(user)) for user in runners}
+
+        # Distinct (runner, event) pairs no runner already holds
+        held = set(Registration.objects.filter(user__in=runners).values_list('user_id', 'event_id'))
+        candidates = [(u.pk, e) for u in runners for e in events if (u.pk, e) not in held]
+        pairs = rng.sample(candidates, min(options['requests'], len(candidates)))
+
+        created = []
+
+        def register(pair):
+            status_code, body, queries = transport.request(
+                'post', '/api/register/', tokens[pair[0]], {'event': pair[1]})
+            if status_code == 201:
+                created.append((pair[0], body['id']))
+            return status_code, queries
+
+        def cancel(item):
+            user_id, registration_id = item
+            status_code, _, queries = transport.request(
+                'patch', f'/api/cancel-registration/{registration_id}/', tokens[user_id], {})
+            return status_code, queries
+
+        def list_events(_):
+            status_code, _, queries = transport.request(
+                'get', '/api/events/?page_size=20', tokens[runners[0].pk])
+            return status_code, queries
+
+        results = {}
+        for phase, func, items in [
+            ('list', list_events, range(options['requests'])),
+            ('register', register, pairs),
+        ]:
+            results[phase] = self.run_phase(func, list(items), options['concurrency'], transport)
+        results['cancel'] = self.run_phase(cancel, created, options['concurrency'], transport)
+        return results
+
+    def run_phase(self, func, items, concurrency, transport):
+        latencies, statuses, query_counts = [], {}, []
+        lock = threading.Lock()
+        pending = iter(items)
+
+        def worker():
+            try:
+                while True:
+                    with lock:
+                        item = next(pending, None)
+                    if item is None:
+                        return
+                    started = time.perf_counter()
+                    status_code, queries = func(item)
+                    elapsed = (time.perf_counter() - started) * 1000
+                    with lock:
+                        latencies.append(elapsed)
+                        statuses[status_code] = statuses.get(status_code, 0) + 1
+                        if queries is not None:
+                            query_counts.append(queries)
+            finally:
+                # Each worker thread opened its own database connection
+                connections.close_all()
+
+        started = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if not latencies:
+            return {'requests': 0}
+        return {
+            'requests': len(latencies),
+            'statuses': {str(code): count for code, count in sorted(statuses.items())},
+            'throughput': len(latencies) / elapsed,
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'queries_per_request': statistics.mean(query_counts) if query_counts else None,
+        }
+
+    def report(self, results, options):
+        self.stdout.write(f"\nconcurrency {options['concurrency']}, "
+                          f"{'server ' + options['url'] if options['url'] else 'in-process WSGI'}")
+        self.stdout.write(f"{'phase':<10}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}"
+                          f"{'p99 ms':>9}{'queries':>9}  statuses")
+        for phase, metrics in results.items():
+            if not metrics['requests']:
+                self.stdout.write(f"{phase:<10}{0:>9}")
+                continue
+            queries = metrics['queries_per_request']
+            self.stdout.write(
+                f"{phase:<10}{metrics['requests']:>9}{metrics['throughput']:>9.1f}"
+                f"{metrics['p50_ms']:>9.1f}{metrics['p95_ms']:>9.1f}{metrics['p99_ms']:>9.1f}"
+                f"{'n/a' if queries is None else f'{queries:.1f}':>9}  {metrics['statuses']}")
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from event.models import AdmissionTicket
+
+
+class Command(BaseCommand):
+    help = "Allocate seats to pending admission tickets in arrival order"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Tickets allocated per transaction (default: 500)")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep polling for new tickets instead of exiting when the queue is empty")
+        parser.add_argument('--interval', type=float, default=0.5,
+                            help="Seconds to sleep when the queue is empty in --loop mode (default: 0.5)")
+
+    def handle(self, *args, **options):
+        total = 0
+        while True:
+            processed = AdmissionTicket.drain(options['batch_size'])
+            total += processed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"Processed {total} admission ticket(s)"))
@@ -0,0 +1,48 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from event.models import AdmissionTicket, Event, Registration, WaitlistEntry
+
+
+class Command(BaseCommand):
+    help = ("Permanently remove soft-deleted events, deleting their registrations "
+            "in small batches so no transaction holds locks for long")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help="Rows deleted per transaction (default: 1000)")
+        parser.add_argument('--pause', type=float, default=0.0,
+                            help="Seconds to sleep between batches (default: 0)")
+        parser.add_argument('--loop', action='store_true',
+                            help="Keep running and purge new deletions as they appear")
+        parser.add_argument('--interval', type=float, default=30.0,
+                            help="Seconds to sleep when nothing is left in --loop mode (default: 30)")
+
+    def handle(self, *args, **options):
+        while True:
+            event_ids = list(Event.all_objects.filter(deleted_at__isnull=False)
+                             .order_by('deleted_at').values_list('pk', flat=True))
+            for event_id in event_ids:
+                self.purge(event_id, options['batch_size'], options['pause'])
+                self.stdout.write(f"Purged event {event_id}")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+    def purge(self, event_id, batch_size, pause):
+        # Dependent rows go first, one bounded batch per transaction, so the
+        # final cascade from the event row has nothing left to collect
+        for model in (AdmissionTicket, WaitlistEntry, Registration):
+            while True:
+                with transaction.atomic():
+                    ids = list(model.objects.filter(event_id=event_id)
+                               .order_by('pk').values_list('pk', flat=True)[:batch_size])
+                    if not ids:
+                        break
+                    # Raw: the event is going, so no seat needs handing back
+                    model.objects.filter(pk__in=ids)._raw_delete(model.objects.db)
+                if pause:
+                    time.sleep(pause)
+        Event.all_objects.filter(pk=event_id).delete()
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from event.cache import invalidate_events_on_commit
+from event.models import Event, EventOccurrence, Registration, WaitlistEntry
+
+
+class Command(BaseCommand):
+    help = "Recompute Event.seats_taken and EventOccurrence.seats_taken from the active registrations"
+
+    def add_arguments(self, parser):
+        parser.add_argument('event_ids', nargs='*', type=int,
+                            help="Only rebuild these events (default: all)")
+
+    def handle(self, *args, **options):
+        # Occurrence registrations count against their occurrence, not the event
+        active_count = Registration.objects.filter(
+            event=OuterRef('pk'), occurrence__isnull=True, status='active'
+        ).order_by().values('event').annotate(n=Count('pk')).values('n')
+        occurrence_count = Registration.objects.filter(
+            occurrence=OuterRef('pk'), status='active'
+        ).order_by().values('occurrence').annotate(n=Count('pk')).values('n')
+
+        events = Event.objects.all()
+        if options['event_ids']:
+            events = events.filter(pk__in=options['event_ids'])
+        occurrences = EventOccurrence.objects.filter(event__in=events)
+
+        with transaction.atomic():
+            # Lock the rows so concurrent claims wait for the rebuilt value
+            event_ids = list(events.order_by('pk').select_for_update().values_list('pk', flat=True))
+            list(occurrences.order_by('pk').select_for_update().values_list('pk', flat=True))
+            updated = events.update(seats_taken=Coalesce(Subquery(active_count), 0), updated_at=timezone.now())
+            updated_occurrences = occurrences.update(seats_taken=Coalesce(Subquery(occurrence_count), 0))
+            invalidate_events_on_commit(event_ids)
+
+            # Seats found free while people wait would otherwise stay empty:
+            # the queue keeps direct sign-ups out and nobody cancels to promote
+            waiting = (WaitlistEntry.objects.filter(event_id__in=event_ids,
+                                                    event__seats_taken__lt=F('event__capacity'))
+                       .order_by('event_id').values_list('event_id', flat=True).distinct())
+            promoted = sum(len(WaitlistEntry.fill_free_seats(event_id)) for event_id in waiting)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt seat counts for {updated} event(s) and {updated_occurrences} occurrence(s); "
+            f"promoted {promoted} waitlisted user(s)"))
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_seats_taken(apps, schema_editor):
+    Event = apps.get_model('event', 'Event')
+    Registration = apps.get_model('event', 'Registration')
+    active_count = Registration.objects.filter(
+        event=OuterRef('pk'), status='active'
+    ).order_by().values('event').annotate(n=Count('pk')).values('n')
+    Event.objects.update(seats_taken=Coalesce(Subquery(active_count), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0002_remove_event_organizer_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='seats_taken',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_seats_taken, migrations.RunPython.noop),
+    ]
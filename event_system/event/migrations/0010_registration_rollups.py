@@ -0,0 +1,45 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:08
+
+from datetime import timezone
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+
+def backfill_signups(apps, schema_editor):
+    # Cancellation times were never stored, so only sign-ups can be rebuilt
+    Registration = apps.get_model('event', 'Registration')
+    RegistrationRollup = apps.get_model('event', 'RegistrationRollup')
+    hours = (Registration.objects.annotate(hour=TruncHour('registration_date', tzinfo=timezone.utc))
+             .values('event_id', 'hour').annotate(n=Count('pk')).order_by())
+    RegistrationRollup.objects.bulk_create(
+        (RegistrationRollup(event_id=row['event_id'], hour=row['hour'], signups=row['n'])
+         for row in hours.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0009_recurring_events'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('signups', models.PositiveIntegerField(default=0)),
+                ('cancellations', models.PositiveIntegerField(default=0)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rollups', to='event.event')),
+            ],
+            options={
+                'unique_together': {('event', 'hour')},
+            },
+        ),
+        migrations.RunPython(backfill_signups, migrations.RunPython.noop),
+    ]
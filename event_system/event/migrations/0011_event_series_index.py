@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('event', '0010_registration_rollups'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(condition=models.Q(('recurrence', ''), _negated=True), fields=['date', 'id'], name='event_series_date_id_idx'),
+        ),
+    ]
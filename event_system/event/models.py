@@ -1,5 +1,18 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, F, When
 from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+import calendar
+
+from .cache import invalidate_events_on_commit
+
+class EventManager(models.Manager):
+    # Soft-deleted events are invisible everywhere except the purge job
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
 
 class Event(models.Model):
     title = models.CharField(max_length=200)
@@ -7,12 +20,156 @@ class Event(models.Model):
     date = models.DateTimeField()
     location = models.CharField(max_length=100)
     capacity = models.PositiveIntegerField()
+    # Denormalized count of active registrations, kept in step by claim_seat/release_seat
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+    # Flash-sale mode: registrations are queued as AdmissionTickets and allocated in batches
+    admission_queue = models.BooleanField(default=False)
+    # Recurrence rule: `date` is the first occurrence; occurrences are expanded on demand
+    RECURRENCE_CHOICES = [
+        ('', 'Does not repeat'),
+        ('daily', 'Daily'),
+        ('weekly', 'Weekly'),
+        ('monthly', 'Monthly'),
+    ]
+    recurrence = models.CharField(max_length=10, choices=RECURRENCE_CHOICES, blank=True, default='')
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_until = models.DateTimeField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by soft_delete(); purge_deleted_events removes the row and its registrations later
+    deleted_at = models.DateTimeField(null=True, blank=True, editable=False)
+    # Computed by PostgreSQL on every write, so it can never go stale
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='english')
+            + SearchVector('location', weight='B', config='english')
+            + SearchVector('description', weight='C', config='english')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = EventManager()
+    all_objects = models.Manager()
+
+    class Meta:
+        base_manager_name = 'all_objects'
+        indexes = [
+            models.Index(fields=['date', 'id'], name='event_date_id_idx'),
+            # Running series listed ahead of date_from (see filter_events)
+            models.Index(fields=['date', 'id'], condition=~models.Q(recurrence=''),
+                         name='event_series_date_id_idx'),
+            models.Index(fields=['location', 'date', 'id'], name='event_location_date_id_idx'),
+            GinIndex(fields=['search_vector'], name='event_search_vector_idx'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='event_title_trgm_idx'),
+            GinIndex(fields=['location'], opclasses=['gin_trgm_ops'], name='event_location_trgm_idx'),
+            models.Index(fields=['deleted_at'], condition=models.Q(deleted_at__isnull=False),
+                         name='event_deleted_at_idx'),
+        ]
 
     def __str__(self):
         return self.title
 
+    def soft_delete(self):
+        self.deleted_at = timezone.now()
+        self.save(update_fields=['deleted_at', 'updated_at'])
+
+    @property
+    def seats_remaining(self):
+        return max(self.capacity - self.seats_taken, 0)
+
+    def occurrences(self, start, end):
+        """
+        Yield the start time of every occurrence between start and end.
+
+        Jumps straight to the first occurrence in the window, so the cost
+        depends on the window size rather than the age of the series.
+        """
+        if self.recurrence_until is not None:
+            end = min(end, self.recurrence_until)
+        if not self.recurrence:
+            if start <= self.date <= end:
+                yield self.date
+            return
+
+        interval = max(self.recurrence_interval, 1)
+        if self.recurrence == 'monthly':
+            month = self.date.year * 12 + self.date.month - 1
+            if start > self.date:
+                skipped = (start.year * 12 + start.month - 1) - month
+                month += max(skipped // interval, 0) * interval
+            while True:
+                year, month_index = divmod(month, 12)
+                month += interval
+                if self.date.replace(year=year, month=month_index + 1, day=1) > end:
+                    return
+                # Months without the start day (e.g. the 31st) are skipped
+                if self.date.day > calendar.monthrange(year, month_index + 1)[1]:
+                    continue
+                occurrence = self.date.replace(year=year, month=month_index + 1)
+                if start <= occurrence <= end:
+                    yield occurrence
+        else:
+            step = timedelta(days=interval * (7 if self.recurrence == 'weekly' else 1))
+            occurrence = self.date
+            if start > occurrence:
+                occurrence += step * -((occurrence - start) // step)
+            while occurrence <= end:
+                yield occurrence
+                occurrence += step
+
+    def is_occurrence(self, moment):
+        return next(self.occurrences(moment, moment), None) is not None
+
+    @classmethod
+    def claim_seat(cls, event_id):
+        # Single conditional UPDATE: succeeds only while a seat is still free
+        claimed = cls.objects.filter(
+            pk=event_id, seats_taken__lt=F('capacity')
+        ).update(seats_taken=F('seats_taken') + 1, updated_at=timezone.now()) == 1
+        if claimed:
+            invalidate_events_on_commit([event_id])
+        return claimed
+
+    @classmethod
+    def release_seat(cls, event_id):
+        # updated_at moves with the counter so ETag/Last-Modified see the change
+        released = cls.objects.filter(
+            pk=event_id, seats_taken__gt=0
+        ).update(seats_taken=F('seats_taken') - 1, updated_at=timezone.now()) == 1
+        if released:
+            invalidate_events_on_commit([event_id])
+        return released
+
+class EventOccurrence(models.Model):
+    """
+    Seat counter for one occurrence of a recurring event.
+
+    Rows are created on the first registration for that date, never ahead
+    of time; dates nobody has signed up for have no row.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='occurrence_set')
+    start = models.DateTimeField()
+    seats_taken = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = [('event', 'start')]
+
+    def __str__(self):
+        return f"Event {self.event_id} @ {self.start.isoformat()}"
+
+    @classmethod
+    def claim_seat(cls, occurrence_id, capacity):
+        return cls.objects.filter(
+            pk=occurrence_id, seats_taken__lt=capacity
+        ).update(seats_taken=F('seats_taken') + 1) == 1
+
+    @classmethod
+    def release_seat(cls, occurrence_id):
+        return cls.objects.filter(
+            pk=occurrence_id, seats_taken__gt=0
+        ).update(seats_taken=F('seats_taken') - 1) == 1
+
 class Registration(models.Model):
     STATUS_CHOICES = [
         ('active', 'Active'),
@@ -28,8 +185,250 @@ class Registration(models.Model):
         default='active'
     )
 
+    # Set for recurring events: which occurrence this seat is for
+    occurrence = models.ForeignKey(EventOccurrence, null=True, blank=True, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'event'], condition=models.Q(occurrence__isnull=True),
+                                    name='registration_user_event_uniq'),
+            models.UniqueConstraint(fields=['user', 'occurrence'], condition=models.Q(occurrence__isnull=False),
+                                    name='registration_user_occurrence_uniq'),
+        ]
+
+    def __str__(self):
+        # Only use related objects that are already loaded; never query from here
+        user = self.user.username if Registration.user.is_cached(self) else f"user {self.user_id}"
+        event = self.event.title if Registration.event.is_cached(self) else f"event {self.event_id}"
+        return f"{user} - {event}"
+
+    @classmethod
+    def register_many(cls, pairs):
+        """
+        Register every (user_id, event_id) pair that fits, in one transaction.
+
+        Capacity is checked once per event against the locked seats_taken
+        counter, all new rows go in with a single bulk_create, and the
+        counters are bumped with one UPDATE. Returns one result dict per
+        pair, in order, with 'status' set to 'created' or 'failed'.
+        """
+        user_ids = {user_id for user_id, _ in pairs}
+        event_ids = {event_id for _, event_id in pairs}
+
+        with transaction.atomic():
+            events = {
+                event.pk: event for event in Event.objects.select_for_update()
+                .filter(pk__in=event_ids).order_by('pk').only('capacity', 'seats_taken', 'recurrence')
+            }
+            active_users = set(User.objects.filter(pk__in=user_ids, is_active=True)
+                               .values_list('pk', flat=True))
+            existing = {
+                (user_id, event_id): (pk, status) for pk, user_id, event_id, status in
+                cls.objects.filter(user_id__in=user_ids, event_id__in=event_ids, occurrence__isnull=True)
+                .values_list('pk', 'user_id', 'event_id', 'status')
+            }
+            taken = {pair for pair, (_, status) in existing.items() if status == 'active'}
+            free = {pk: max(event.capacity - event.seats_taken, 0) for pk, event in events.items()}
+
+            results, new_registrations, reactivated = [], [], []
+            for user_id, event_id in pairs:
+                result = {'user': user_id, 'event': event_id}
+                if event_id not in events:
+                    result['error'] = "Event not found"
+                elif user_id not in active_users:
+                    result['error'] = "User not found"
+                elif events[event_id].recurrence:
+                    result['error'] = "Recurring event: register for an occurrence"
+                elif (user_id, event_id) in taken:
+                    result['error'] = "Already registered"
+                elif free[event_id] == 0:
+                    result['error'] = "Event is full"
+                else:
+                    taken.add((user_id, event_id))
+                    free[event_id] -= 1
+                    if (user_id, event_id) in existing:
+                        # A cancelled registration is switched back on rather than duplicated
+                        result['id'] = existing[user_id, event_id][0]
+                        reactivated.append(result)
+                    else:
+                        new_registrations.append((result, cls(user_id=user_id, event_id=event_id)))
+                result['status'] = 'failed' if 'error' in result else 'created'
+                results.append(result)
+
+            if new_registrations:
+                created = cls.objects.bulk_create([reg for _, reg in new_registrations])
+                for (result, _), registration in zip(new_registrations, created):
+                    result['id'] = registration.pk
+            if reactivated:
+                cls.objects.filter(pk__in=[result['id'] for result in reactivated]).update(status='active')
+
+            if new_registrations or reactivated:
+                claimed = {}
+                for result in [result for result, _ in new_registrations] + reactivated:
+                    claimed[result['event']] = claimed.get(result['event'], 0) + 1
+                Event.objects.filter(pk__in=claimed).update(updated_at=timezone.now(), seats_taken=F('seats_taken') + Case(
+                    *[When(pk=pk, then=count) for pk, count in claimed.items()]))
+                RegistrationRollup.record(claimed, 'signups')
+                invalidate_events_on_commit(claimed)
+
+        return results
+
+
+class RegistrationRollup(models.Model):
+    """
+    Sign-ups and cancellations of one event in one hour.
+
+    Kept up to date as registrations are created and cancelled, so the
+    timeline endpoint reads these rows instead of aggregating registrations.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name='rollups')
+    hour = models.DateTimeField()
+    signups = models.PositiveIntegerField(default=0)
+    cancellations = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = [('event', 'hour')]
+
+    def __str__(self):
+        return f"Event {self.event_id} @ {self.hour:%Y-%m-%d %H:00}: +{self.signups} -{self.cancellations}"
+
+    @classmethod
+    def record(cls, counts, field):
+        """
+        Add counts ({event_id: n}) to `field` of the current hour's rows.
+
+        Call it inside the transaction that writes the registrations. Usually
+        a single UPDATE; the first write of an hour inserts the rows first.
+        """
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        rows = cls.objects.filter(event_id__in=counts, hour=hour)
+        increment = {field: F(field) + Case(*[When(event_id=pk, then=n) for pk, n in counts.items()])}
+        if len(counts) == 1 and rows.update(**increment):
+            return
+        # ON CONFLICT DO NOTHING, so concurrent first writers can't lose counts
+        cls.objects.bulk_create([cls(event_id=pk, hour=hour) for pk in counts], ignore_conflicts=True)
+        rows.update(**increment)
+
+
+class WaitlistEntry(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
     class Meta:
         unique_together = [('user', 'event')]
+        # Queue order is id order; this index serves both promotion and position counts
+        indexes = [models.Index(fields=['event', 'id'], name='waitlist_event_id_idx')]
+        verbose_name_plural = 'waitlist entries'
 
     def __str__(self):
-        return f"{self.user.username} - {self.event.title}"
\ No newline at end of file
+        return f"Waitlist #{self.pk}: user {self.user_id}, event {self.event_id}"
+
+    @classmethod
+    def promote_next(cls, event_id):
+        """
+        Hand a freed seat to the longest-waiting user of the event.
+
+        Must run inside the transaction that frees the seat. Returns the
+        promoted registration, or None when nobody is waiting.
+        """
+        while True:
+            entry = (cls.objects.select_for_update(skip_locked=True)
+                     .filter(event_id=event_id).order_by('id').first())
+            if entry is None:
+                return None
+            entry.delete()
+            registration, created = Registration.objects.get_or_create(
+                user_id=entry.user_id, event_id=event_id)
+            if created or registration.status != 'active':
+                if not created:
+                    registration.status = 'active'
+                    registration.save(update_fields=['status'])
+                RegistrationRollup.record({event_id: 1}, 'signups')
+                return registration
+            # Already holds a seat (registered directly), try the next one
+
+    @classmethod
+    def fill_free_seats(cls, event_id):
+        """
+        Hand seats freed by a capacity increase to the waitlist, in queue order.
+
+        Returns the promoted registrations.
+        """
+        promoted = []
+        with transaction.atomic():
+            while Event.claim_seat(event_id):
+                registration = cls.promote_next(event_id)
+                if registration is None:
+                    Event.release_seat(event_id)
+                    break
+                promoted.append(registration)
+        return promoted
+
+
+
+class AdmissionTicket(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('admitted', 'Admitted'),
+        ('rejected', 'Rejected'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    event = models.ForeignKey(Event, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    registration = models.OneToOneField(Registration, null=True, blank=True, on_delete=models.SET_NULL)
+    error = models.CharField(max_length=100, blank=True)
+
+    class Meta:
+        unique_together = [('user', 'event')]
+        # The drainer only ever scans pending tickets in arrival order
+        indexes = [models.Index(fields=['id'], condition=models.Q(status='pending'),
+                                name='admission_pending_idx')]
+
+    def __str__(self):
+        return f"Ticket #{self.pk}: user {self.user_id}, event {self.event_id} ({self.status})"
+
+    @classmethod
+    def issue(cls, user, event):
+        """
+        The user's ticket for the event, queued afresh when needed.
+
+        A pending ticket, or an admitted one whose registration is still
+        active, is returned as is. A rejected ticket, or one whose
+        registration was cancelled since, is replaced by a new ticket at the
+        back of the queue.
+        """
+        with transaction.atomic():
+            ticket = cls.objects.select_related('registration').filter(user=user, event=event).first()
+            if ticket is not None:
+                if ticket.status == 'pending' or (
+                        ticket.status == 'admitted' and ticket.registration is not None
+                        and ticket.registration.status == 'active'):
+                    return ticket
+                ticket.delete()
+            ticket, _ = cls.objects.get_or_create(user=user, event=event)
+        return ticket
+
+    @classmethod
+    def drain(cls, batch_size=500):
+        """
+        Allocate seats to the oldest pending tickets, one batch at a time.
+
+        Tickets are claimed with SKIP LOCKED so several drainers can run
+        side by side. Returns the number of tickets processed.
+        """
+        with transaction.atomic():
+            tickets = list(cls.objects.select_for_update(skip_locked=True)
+                           .filter(status='pending').order_by('id')[:batch_size])
+            if not tickets:
+                return 0
+            results = Registration.register_many([(t.user_id, t.event_id) for t in tickets])
+            for ticket, result in zip(tickets, results):
+                if result['status'] == 'created':
+                    ticket.status, ticket.registration_id = 'admitted', result['id']
+                else:
+                    ticket.status, ticket.error = 'rejected', result['error']
+            cls.objects.bulk_update(tickets, ['status', 'registration', 'error'])
+        return len(tickets)
@@ -0,0 +1,138 @@
+from base64 import b64decode, b64encode
+from urllib import parse
+
+from django.db.models import Q, QuerySet
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+def union_branches(queryset):
+    """The querysets a union was built from, each of which can be filtered again."""
+    if queryset.query.combinator != 'union':
+        return [queryset]
+    return [QuerySet(queryset.model, query=query.clone()) for query in queryset.query.combined_queries]
+
+
+class EventCursorPagination(BasePagination):
+    """
+    Keyset pagination over (date, id).
+
+    Each page is fetched with a range condition on the (date, id) index
+    instead of an OFFSET, so deep pages cost the same as the first one.
+    A union is paged branch by branch, each on its own index, and the
+    branch pages merged in the database.
+    """
+    page_size = 20
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self.get_page_queryset(queryset, request)
+        return self.set_page([event async for event in queryset])
+
+    def get_page_queryset(self, queryset, request):
+        # One row more than the page size tells us whether another page exists
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor['reverse']
+
+        ordering = ('-date', '-id') if reverse else ('date', 'id')
+        pages = [self.apply_cursor(branch, reverse).order_by(*ordering)[:self.page_size + 1]
+                 for branch in union_branches(queryset)]
+        if len(pages) == 1:
+            return pages[0]
+        return pages[0].union(*pages[1:], all=True).order_by(*ordering)[:self.page_size + 1]
+
+    def apply_cursor(self, queryset, reverse):
+        if self.cursor is None:
+            return queryset
+        date, pk = self.cursor['date'], self.cursor['id']
+        if reverse:
+            return queryset.filter(date__lte=date).filter(
+                Q(date__lt=date) | Q(date=date, id__lt=pk))
+        return queryset.filter(date__gte=date).filter(
+            Q(date__gt=date) | Q(date=date, id__gt=pk))
+
+    def set_page(self, results):
+        reverse = self.cursor is not None and self.cursor['reverse']
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def get_paginated_response(self, data):
+        return Response(self.get_paginated_data(data))
+
+    def get_paginated_data(self, data):
+        return {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'),
+                                    keep_blank_values=True)
+            date = parse_datetime(tokens['d'][0])
+            pk = int(tokens['i'][0])
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if date is None:
+            raise NotFound(self.invalid_cursor_message)
+        return {'date': date, 'id': pk, 'reverse': reverse}
+
+    def encode_cursor(self, event, reverse):
+        tokens = {'d': event.date.isoformat(), 'i': event.pk}
+        if reverse:
+            tokens['r'] = '1'
+        encoded = b64encode(parse.urlencode(tokens, doseq=True).encode('ascii')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, encoded)
@@ -1,31 +1,201 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import Event, Registration
+from rest_framework.settings import api_settings
+from .models import AdmissionTicket, Event, EventOccurrence, Registration, RegistrationRollup, WaitlistEntry
 
 class EventSerializer(serializers.ModelSerializer):
+    seats_remaining = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Event
+        exclude = ['search_vector']
+
+class EventAvailabilitySerializer(serializers.ModelSerializer):
+    seats_remaining = serializers.IntegerField(read_only=True)
+
     class Meta:
         model = Event
-        fields = '__all__'
+        fields = ['id', 'capacity', 'seats_taken', 'seats_remaining']
+
+class EventSearchSerializer(EventSerializer):
+    rank = serializers.FloatField(read_only=True)
+
+class EventSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Event
+        fields = ['id', 'title', 'date', 'location']
 
 class RegistrationSerializer(serializers.ModelSerializer):
+    # Start time of the chosen occurrence; required for recurring events only
+    occurrence = serializers.DateTimeField(source='occurrence.start', required=False, allow_null=True)
+
     class Meta:
         model = Registration
-        fields = ['id', 'event', 'user', 'status', 'registration_date']
+        fields = ['id', 'event', 'occurrence', 'user', 'status', 'registration_date']
         read_only_fields = ['user', 'registration_date']
 
     def validate(self, data):
-        # Handle both create and update operations
+        occurrence_start = (data.pop('occurrence', None) or {}).get('start')
         event = data.get('event')
-        
-        # For updates, get event from existing instance
-        if not event and self.instance:
-            event = self.instance.event
-            
-        # Only check capacity for active registrations
-        if event and data.get('status', 'active') == 'active':
-            active_registrations = event.registration_set.filter(status='active').count()
-            
-            # Check if event is full
-            if active_registrations >= event.capacity:
-                raise serializers.ValidationError("Event is full")
-                
-        return data
\ No newline at end of file
+
+        if self.instance is not None:
+            if event and event.pk != self.instance.event_id and (
+                    event.recurrence or self.instance.occurrence_id):
+                raise serializers.ValidationError({
+                    'event': ["Registrations for recurring events cannot be moved."]})
+            return data
+
+        if event.recurrence:
+            if occurrence_start is None:
+                raise serializers.ValidationError({
+                    'occurrence': ["This field is required for recurring events."]})
+            if not event.is_occurrence(occurrence_start):
+                raise serializers.ValidationError({
+                    'occurrence': ["Not an occurrence of this event."]})
+            data['occurrence_start'] = occurrence_start
+        elif occurrence_start is not None:
+            raise serializers.ValidationError({
+                'occurrence': ["Only recurring events have occurrences."]})
+        else:
+            # Queued users get any free seat first; seats beyond the queue stay open
+            waiting = WaitlistEntry.objects.filter(event=event).count()
+            if waiting and event.capacity - event.seats_taken <= waiting:
+                raise serializers.ValidationError({
+                    api_settings.NON_FIELD_ERRORS_KEY: ["Event has a waitlist; join it instead"]})
+        return data
+
+    def create(self, validated_data):
+        # Claim the seat and insert the row in one transaction so a failed
+        # insert (e.g. duplicate registration) gives the seat back
+        try:
+            with transaction.atomic():
+                occurrence_start = validated_data.pop('occurrence_start', None)
+                if occurrence_start is not None:
+                    # First registration for a date creates its seat counter
+                    validated_data['occurrence'], _ = EventOccurrence.objects.get_or_create(
+                        event=validated_data['event'], start=occurrence_start)
+                occurrence = validated_data.get('occurrence')
+                # A cancelled registration is switched back on rather than duplicated;
+                # an active one still fails the insert below
+                lookup = ({'occurrence': occurrence} if occurrence is not None
+                          else {'event': validated_data['event'], 'occurrence__isnull': True})
+                previous = (Registration.objects.select_for_update()
+                            .filter(user=validated_data['user'], **lookup)
+                            .exclude(status='active').first())
+                if validated_data.get('status', 'active') == 'active':
+                    self._claim_seat(validated_data['event'], occurrence)
+                    RegistrationRollup.record({validated_data['event'].pk: 1}, 'signups')
+                if previous is not None:
+                    previous.status = validated_data.get('status', 'active')
+                    previous.save(update_fields=['status'])
+                    return previous
+                return super().create(validated_data)
+        except IntegrityError as exc:
+            constraint = getattr(getattr(exc.__cause__, 'diag', None), 'constraint_name', None)
+            if constraint not in ('registration_user_event_uniq', 'registration_user_occurrence_uniq'):
+                raise
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ["Already registered"]
+            })
+
+    def update(self, instance, validated_data):
+        was_active = instance.status == 'active'
+        is_active = validated_data.get('status', instance.status) == 'active'
+        old_event = instance.event
+        new_event = validated_data.get('event', old_event)
+        occurrence = instance.occurrence
+
+        with transaction.atomic():
+            if is_active and (not was_active or new_event.pk != old_event.pk):
+                self._claim_seat(new_event, occurrence)
+                RegistrationRollup.record({new_event.pk: 1}, 'signups')
+            registration = super().update(instance, validated_data)
+            if was_active and (not is_active or new_event.pk != old_event.pk):
+                RegistrationRollup.record({old_event.pk: 1}, 'cancellations')
+                if occurrence is not None:
+                    EventOccurrence.release_seat(occurrence.pk)
+                # The seat passes straight to the head of the waitlist if there is one
+                elif WaitlistEntry.promote_next(old_event.pk) is None:
+                    Event.release_seat(old_event.pk)
+            return registration
+
+    def _claim_seat(self, event, occurrence=None):
+        if occurrence is not None:
+            claimed = EventOccurrence.claim_seat(occurrence.pk, event.capacity)
+        else:
+            claimed = Event.claim_seat(event.pk)
+        if not claimed:
+            raise serializers.ValidationError({
+                api_settings.NON_FIELD_ERRORS_KEY: ["Event is full"]
+            })
+
+
+class RegistrationWithEventSerializer(serializers.ModelSerializer):
+    event = EventSummarySerializer(read_only=True)
+    occurrence = serializers.DateTimeField(source='occurrence.start', read_only=True)
+
+    class Meta:
+        model = Registration
+        fields = ['id', 'event', 'occurrence', 'user', 'status', 'registration_date']
+        read_only_fields = fields
+
+
+class EventOccurrenceSerializer(serializers.Serializer):
+    start = serializers.DateTimeField()
+    seats_taken = serializers.IntegerField()
+    seats_remaining = serializers.IntegerField()
+
+
+class RegistrationRollupSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = RegistrationRollup
+        fields = ['hour', 'signups', 'cancellations']
+
+
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    position = serializers.SerializerMethodField()
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'event', 'user', 'position', 'created_at']
+        read_only_fields = ['user', 'created_at']
+
+    def get_position(self, obj):
+        position = getattr(obj, 'position', None)
+        if position is None:
+            position = WaitlistEntry.objects.filter(event_id=obj.event_id, id__lte=obj.pk).count()
+        return position
+
+    def validate_event(self, event):
+        user = self.context['request'].user
+        if event.recurrence:
+            raise serializers.ValidationError("Recurring events have no waitlist")
+        if Registration.objects.filter(user=user, event=event, status='active').exists():
+            raise serializers.ValidationError("Already registered")
+        if WaitlistEntry.objects.filter(user=user, event=event).exists():
+            raise serializers.ValidationError("Already on the waitlist")
+        # Free seats already owed to the queue don't count
+        free = event.capacity - event.seats_taken
+        if free > 0 and free > WaitlistEntry.objects.filter(event=event).count():
+            raise serializers.ValidationError("Event has free seats")
+        return event
+
+
+class AdmissionTicketSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AdmissionTicket
+        fields = ['id', 'event', 'user', 'status', 'registration', 'error', 'created_at']
+        read_only_fields = fields
+
+
+class BulkRegistrationItemSerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    event = serializers.IntegerField()
+
+
+class BulkRegistrationSerializer(serializers.Serializer):
+    registrations = BulkRegistrationItemSerializer(many=True, allow_empty=False, max_length=1000)
+
+    def create(self, validated_data):
+        rows = validated_data['registrations']
+        return Registration.register_many([(row['user'], row['event']) for row in rows])
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import user_cache
+from .cache import invalidate_event
+from .models import Event, EventOccurrence, Registration
+
+
+@receiver([post_save, post_delete], sender=Event)
+def invalidate_event_cache(sender, instance, **kwargs):
+    # Wait for the commit so a concurrent reader cannot re-cache the old row
+    pk = instance.pk
+    transaction.on_commit(lambda: invalidate_event(pk))
+
+
+@receiver(post_delete, sender=Registration)
+def release_deleted_seat(sender, instance, **kwargs):
+    # Rows removed without a cancel (user deleted, admin delete) still held a
+    # seat; purge_deleted_events skips this by deleting raw
+    if instance.status != 'active':
+        return
+    if instance.occurrence_id is not None:
+        EventOccurrence.release_seat(instance.occurrence_id)
+    else:
+        Event.release_seat(instance.event_id)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user_cache(sender, instance, **kwargs):
+    # Covers deactivation and password changes; evict right away and again
+    # after commit so a concurrent request cannot re-cache the old row
+    user_cache.invalidate(instance.pk)
+    pk = instance.pk
+    transaction.on_commit(lambda: user_cache.invalidate(pk))
@@ -1,3 +1,1105 @@
-from django.test import TestCase
+import csv
+import json
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import CommandError, call_command
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import cache as event_cache
+from . import throttling
+from .authentication import user_cache
+from .management.commands.benchmark_registrations import compare_to_baseline
+from .models import AdmissionTicket, Event, EventOccurrence, Registration, RegistrationRollup, WaitlistEntry
+
+
+def make_event(**kwargs):
+    fields = {
+        'title': 'Django Meetup',
+        'description': 'Monthly meetup',
+        'date': timezone.now() + timedelta(days=7),
+        'location': 'Lagos',
+        'capacity': 2,
+    }
+    fields.update(kwargs)
+    return Event.objects.create(**fields)
+
+
+class EventAPITestCase(APITestCase):
+    def setUp(self):
+        event_cache.get_cache().clear()
+        throttling.reset()
+
+
+class SeatCounterTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event()
+        self.users = [User.objects.create_user(f'user{i}', password='pass') for i in range(3)]
+
+    def register(self, user, event=None):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('registration-create'),
+                                {'event': (event or self.event).pk})
+
+    def test_registration_claims_a_seat(self):
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_full_event_rejects_registration(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        response = self.register(self.users[2])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Event is full'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertFalse(Registration.objects.filter(user=self.users[2]).exists())
+
+    def test_cancel_releases_seat(self):
+        registration_id = self.register(self.users[0]).data['id']
+        self.register(self.users[1])
+        response = self.client.patch(reverse('registration-cancel', args=[registration_id]), {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+        self.assertEqual(self.register(self.users[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_register_again_after_cancelling(self):
+        registration_id = self.register(self.users[0]).data['id']
+        self.client.patch(reverse('registration-cancel', args=[registration_id]), {})
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['id'], registration_id)
+        self.assertEqual(response.data['status'], 'active')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_deleting_a_user_frees_their_seat(self):
+        self.register(self.users[0])
+        self.register(self.users[1])
+        self.users[0].delete()
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+        self.assertEqual(self.register(self.users[2]).status_code, status.HTTP_201_CREATED)
+
+    def test_duplicate_registration_does_not_leak_seat(self):
+        self.register(self.users[0])
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Already registered'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_registration_query_count_is_independent_of_attendance(self):
+        big_event = make_event(capacity=1000)
+        for i in range(50):
+            user = User.objects.create_user(f'attendee{i}')
+            Registration.objects.create(user=user, event=big_event)
+        self.client.force_authenticate(self.users[0])
+        # 7 (including the waitlist check and the look for a cancelled row to
+        # reuse), plus 3 for the first sign-up of the hour inserting its rollup row
+        with self.assertNumQueries(10):
+            self.client.post(reverse('registration-create'), {'event': big_event.pk})
+
+    def test_rebuild_seat_counts(self):
+        Registration.objects.create(user=self.users[0], event=self.event)
+        Registration.objects.create(user=self.users[1], event=self.event, status='cancelled')
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=2)
+        call_command('rebuild_seat_counts', stdout=StringIO())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+
+class EventListPaginationTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.start = timezone.now().replace(microsecond=0) + timedelta(days=1)
+        # Pairs of events share a date so the id tie-breaker is exercised
+        self.events = [
+            make_event(title=f'Event {i}', date=self.start + timedelta(days=i // 2),
+                       location='Lagos' if i % 3 else 'Abuja')
+            for i in range(9)
+        ]
+
+    def test_walks_all_pages_in_date_id_order(self):
+        url = reverse('event-list') + '?page_size=4'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, [event.pk for event in self.events])
+
+    def test_previous_link_returns_preceding_page(self):
+        first = self.client.get(reverse('event-list') + '?page_size=4').data
+        self.assertIsNone(first['previous'])
+        second = self.client.get(first['next']).data
+        back = self.client.get(second['previous']).data
+        self.assertEqual([item['id'] for item in back['results']],
+                         [item['id'] for item in first['results']])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('event-list') + '?cursor=bogus')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_date_and_location_filters(self):
+        day = (self.start + timedelta(days=1)).date().isoformat()
+        response = self.client.get(reverse('event-list'),
+                                   {'date_from': day, 'date_to': day, 'location': 'Lagos'})
+        expected = [e.pk for e in self.events
+                    if e.date.date().isoformat() == day and e.location == 'Lagos']
+        self.assertEqual([item['id'] for item in response.data['results']], expected)
+
+    def test_invalid_date_filter(self):
+        response = self.client.get(reverse('event-list'), {'date_from': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class EventCacheTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event()
+        self.user = User.objects.create_user('organizer', password='pass')
+
+    def test_list_hit_does_not_touch_database(self):
+        url = reverse('event-list')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['results'][0]['id'], self.event.pk)
+
+    def test_list_is_keyed_by_query_params(self):
+        self.client.get(reverse('event-list'))
+        response = self.client.get(reverse('event-list'), {'location': 'Nowhere'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_detail_hit_does_not_touch_database(self):
+        self.client.force_authenticate(self.user)
+        url = reverse('event-detail', args=[self.event.pk])
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response.data['title'], 'Django Meetup')
+
+    def test_save_invalidates_list_and_detail(self):
+        self.client.force_authenticate(self.user)
+        detail_url = reverse('event-detail', args=[self.event.pk])
+        self.client.get(reverse('event-list'))
+        self.client.get(detail_url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(detail_url, {'title': 'Renamed'})
+
+        self.assertEqual(self.client.get(detail_url).data['title'], 'Renamed')
+        self.assertEqual(self.client.get(reverse('event-list')).data['results'][0]['title'],
+                         'Renamed')
+
+    def test_delete_invalidates_list(self):
+        self.client.get(reverse('event-list'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.event.delete()
+        self.assertEqual(self.client.get(reverse('event-list')).data['results'], [])
+
+
+class ConditionalGetTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=5)
+        self.user = User.objects.create_user('poller')
+        self.client.force_authenticate(self.user)
+        self.list_url = reverse('event-list')
+        self.detail_url = reverse('event-detail', args=[self.event.pk])
+
+    def test_unchanged_list_is_not_modified(self):
+        etag = self.client.get(self.list_url)['ETag']
+        event_cache.get_cache().clear()
+        # Only the validator query runs; the page is never fetched or serialized
+        with self.assertNumQueries(1):
+            response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+
+    def test_list_validator_follows_edits_and_deletions(self):
+        etag = self.client.get(self.list_url)['ETag']
+        make_event(title='Another one')
+        event_cache.get_cache().clear()
+        response = self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        etag = response['ETag']
+        self.event.soft_delete()
+        event_cache.get_cache().clear()
+        self.assertNotEqual(self.client.get(self.list_url, HTTP_IF_NONE_MATCH=etag).status_code,
+                            status.HTTP_304_NOT_MODIFIED)
+
+    def test_list_validator_depends_on_filters(self):
+        etag = self.client.get(self.list_url)['ETag']
+        response = self.client.get(self.list_url, {'location': 'Lagos'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_detail_if_modified_since(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(self.detail_url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_seat_changes_update_the_detail_validator(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('registration-create'), {'event': self.event.pk})
+        response = self.client.get(self.detail_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['seats_remaining'], 4)
+
+    def test_missing_event_is_still_404(self):
+        response = self.client.get(reverse('event-detail', args=[self.event.pk + 100]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CalendarFeedTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('subscriber')
+        self.events = [make_event(title=f'Talk {i}, part {i}') for i in range(3)]
+        self.weekly = make_event(title='Standup', recurrence='weekly',
+                                 date=timezone.now().replace(microsecond=0) + timedelta(days=1))
+        for event in self.events[:2]:
+            Registration.objects.create(user=self.user, event=event)
+        Registration.objects.create(user=self.user, event=self.weekly,
+                                    occurrence=EventOccurrence.objects.create(event=self.weekly,
+                                                                              start=self.weekly.date))
+        self.url = reverse('registration-calendar')
+
+    def read(self, response):
+        return b''.join(response.streaming_content).decode()
+
+    def feed_url(self):
+        self.client.force_authenticate(self.user)
+        url = self.client.get(reverse('registration-calendar-link')).data['url']
+        self.client.force_authenticate(None)
+        return url
+
+    def test_user_feed_is_one_query_and_streamed(self):
+        self.client.force_authenticate(self.user)
+        response = self.client.get(self.url, HTTP_ACCEPT='text/calendar')
+        self.assertEqual(response['Content-Type'], 'text/calendar; charset=utf-8')
+        with self.assertNumQueries(1):
+            body = self.read(response)
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertEqual(body.count('BEGIN:VEVENT'), 3)
+        self.assertIn('SUMMARY:Talk 0\\, part 0', body)
+        self.assertNotIn('Talk 2', body)
+
+    def test_subscription_key(self):
+        response = self.client.get(self.feed_url())
+        self.assertEqual(self.read(response).count('BEGIN:VEVENT'), 3)
+        response = self.client.get(self.url, {'key': 'forged'})
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_revokes_the_subscription_key(self):
+        url = self.feed_url()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+        self.user.set_password('new secret')
+        self.user.save()
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(self.client.get(self.feed_url()).status_code, status.HTTP_200_OK)
+
+    def test_user_feed_validators(self):
+        url = self.feed_url()
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        Registration.objects.filter(event=self.events[0]).update(status='cancelled')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_event_feed_carries_the_recurrence_rule(self):
+        response = self.client.get(reverse('event-calendar', args=[self.weekly.pk]))
+        body = self.read(response)
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=1\r\n', body)
+        response = self.client.get(reverse('event-calendar', args=[self.weekly.pk]),
+                                   HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_long_lines_are_folded(self):
+        event = make_event(description='é' * 100)
+        body = self.read(self.client.get(reverse('event-calendar', args=[event.pk])))
+        self.assertTrue(all(len(line.encode()) <= 75 for line in body.split('\r\n')))
+        self.assertIn('é' * 100, body.replace('\r\n ', ''))
+
+
+class RegistrationTimelineTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=10)
+        self.users = [User.objects.create_user(f'fan{i}') for i in range(4)]
+        self.admin = User.objects.create_superuser('organizer', password='pass')
+        self.url = reverse('event-timeline', args=[self.event.pk])
+
+    def register(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('registration-create'), {'event': self.event.pk}).data['id']
+
+    def test_rollup_follows_signups_and_cancellations(self):
+        ids = [self.register(user) for user in self.users[:3]]
+        self.client.force_authenticate(self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[ids[0]]), {})
+        Registration.register_many([(self.users[3].pk, self.event.pk)])
+
+        rollup = RegistrationRollup.objects.get(event=self.event)
+        self.assertEqual((rollup.signups, rollup.cancellations), (4, 1))
+        self.assertEqual(rollup.hour, timezone.now().replace(minute=0, second=0, microsecond=0))
+
+    def test_waitlist_promotion_counts_as_signup(self):
+        self.event.capacity = 1
+        self.event.save()
+        first = self.register(self.users[0])
+        WaitlistEntry.objects.create(user=self.users[1], event=self.event)
+        self.client.force_authenticate(self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[first]), {})
+        rollup = RegistrationRollup.objects.get(event=self.event)
+        self.assertEqual((rollup.signups, rollup.cancellations), (2, 1))
+
+    def test_timeline_reads_only_rollups(self):
+        hour = timezone.now().replace(minute=0, second=0, microsecond=0)
+        RegistrationRollup.objects.bulk_create([
+            RegistrationRollup(event=self.event, hour=hour - timedelta(hours=h), signups=h, cancellations=1)
+            for h in range(48)
+        ])
+        self.client.force_authenticate(self.admin)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'date_from': (hour - timedelta(hours=9)).isoformat()})
+        self.assertEqual(len(response.data['hours']), 10)
+        self.assertEqual(response.data['signups'], sum(range(10)))
+        self.assertEqual(response.data['cancellations'], 10)
+        self.assertEqual(response.data['hours'][-1]['hour'], hour.isoformat().replace('+00:00', 'Z'))
+
+    def test_timeline_is_for_admins(self):
+        self.client.force_authenticate(self.users[0])
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+@override_settings(EVENT_THROTTLE_BUCKETS={'user': {'rate': 0.001, 'burst': 3},
+                                           'event': {'rate': 0.001, 'burst': 5}})
+class RegistrationThrottleTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=100)
+        self.user = User.objects.create_user('retrier')
+        self.client.force_authenticate(self.user)
+
+    def register(self, event_id):
+        return self.client.post(reverse('registration-create'), {'event': event_id})
+
+    def test_user_bucket_rejects_before_the_orm(self):
+        for _ in range(3):
+            self.register(self.event.pk + 1000)
+        with self.assertNumQueries(0):
+            response = self.register(self.event.pk)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_event_bucket_is_shared_by_users(self):
+        for i in range(6):
+            self.client.force_authenticate(User.objects.create_user(f'rush{i}'))
+            response = self.register(self.event.pk)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertEqual(Registration.objects.filter(event=self.event).count(), 5)
+
+    def test_cancel_uses_the_user_bucket(self):
+        registration = Registration.objects.create(user=self.user, event=self.event)
+        url = reverse('registration-cancel', args=[registration.pk])
+        statuses = [self.client.patch(url, {}).status_code for _ in range(4)]
+        self.assertEqual(statuses[-1], status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_tokens_refill(self):
+        buckets = throttling.LocalBuckets()
+        self.assertEqual(buckets.take('k', 2, 1, now=100.0), 0)
+        self.assertAlmostEqual(buckets.take('k', 2, 1, now=100.25), 0.25)
+        self.assertEqual(buckets.take('k', 2, 1, now=100.75), 0)
+
+    @override_settings(EVENT_THROTTLE_CACHE_ALIAS='default')
+    def test_shared_backend_limits_across_processes(self):
+        for _ in range(3):
+            self.register(self.event.pk + 1000)
+        throttling.local_buckets.clear()  # as if the next request hit another worker
+        self.assertEqual(self.register(self.event.pk).status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+    def test_stats(self):
+        for _ in range(4):
+            self.register(self.event.pk + 1000)
+        self.client.force_authenticate(User.objects.create_superuser('ops', password='pass'))
+        scopes = self.client.get(reverse('throttle-stats')).data['scopes']
+        self.assertEqual(scopes['user'], {'hits': 1, 'misses': 3})
+        self.assertEqual(scopes['event'], {'hits': 0, 'misses': 3})
+
+    def test_flooding_user_does_not_lock_others_out_of_the_event(self):
+        statuses = [self.register(self.event.pk).status_code for _ in range(10)]
+        self.assertEqual(statuses.count(status.HTTP_429_TOO_MANY_REQUESTS), 7)
+
+        self.client.force_authenticate(User.objects.create_user('patient'))
+        self.assertEqual(self.register(self.event.pk).status_code, status.HTTP_201_CREATED)
+
+    def test_rejected_requests_take_no_tokens(self):
+        buckets = throttling.LocalBuckets()
+        user, event = ('user:1', 1, 1), ('event:1', 1, 1)
+        self.assertEqual(buckets.take_all([user, event], now=100.0), (None, 0))
+        self.assertEqual(buckets.take_all([('user:2', 1, 1), event], now=100.0), (1, 1))
+        # user:2 was turned away by the event bucket and keeps its token
+        self.assertEqual(buckets.take('user:2', 1, 1, now=100.0), 0)
+
+
+class BulkRegistrationTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = User.objects.create_superuser('admin', password='pass')
+        self.client.force_authenticate(self.admin)
+        self.event = make_event(capacity=3)
+        self.users = [User.objects.create_user(f'staff{i}') for i in range(5)]
+
+    def post(self, pairs):
+        return self.client.post(reverse('registration-bulk-create'), {
+            'registrations': [{'user': user, 'event': event} for user, event in pairs]
+        }, format='json')
+
+    def test_reports_per_row_results(self):
+        Registration.objects.create(user=self.users[0], event=self.event)
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=1)
+        pairs = [(user.pk, self.event.pk) for user in self.users] + [(self.users[1].pk, 0)]
+
+        response = self.post(pairs)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual([row.get('error') for row in response.data['results']], [
+            'Already registered', None, None, 'Event is full', 'Event is full', 'Event not found',
+        ])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+        self.assertEqual(Registration.objects.filter(event=self.event).count(), 3)
+        self.assertTrue(Registration.objects.filter(pk=response.data['results'][1]['id']).exists())
+
+    def test_duplicate_rows_in_one_batch(self):
+        response = self.post([(self.users[0].pk, self.event.pk)] * 2)
+        self.assertEqual([row['status'] for row in response.data['results']],
+                         ['created', 'failed'])
+
+    def test_query_count_is_independent_of_batch_size(self):
+        other = make_event(capacity=100)
+        users = [User.objects.create_user(f'cohort{i}') for i in range(40)]
+        # Includes the two rollup statements
+        with self.assertNumQueries(9):
+            self.post([(user.pk, event.pk) for user in users for event in (self.event, other)])
+        other.refresh_from_db()
+        self.assertEqual(other.seats_taken, 40)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.users[0])
+        response = self.post([(self.users[0].pk, self.event.pk)])
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class WaitlistTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=1)
+        self.users = [User.objects.create_user(f'fan{i}') for i in range(4)]
+        self.client.force_authenticate(self.users[0])
+        self.registration_id = self.client.post(
+            reverse('registration-create'), {'event': self.event.pk}).data['id']
+
+    def join(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('waitlist-list'), {'event': self.event.pk})
+
+    def test_join_reports_position(self):
+        self.assertEqual(self.join(self.users[1]).data['position'], 1)
+        entry_id = self.join(self.users[2]).data['id']
+        response = self.client.get(reverse('waitlist-detail', args=[entry_id]))
+        self.assertEqual(response.data['position'], 2)
+
+    def test_cannot_join_with_free_seats_or_twice(self):
+        self.assertEqual(self.join(self.users[0]).status_code, status.HTTP_400_BAD_REQUEST)
+        self.join(self.users[1])
+        self.assertEqual(self.join(self.users[1]).status_code, status.HTTP_400_BAD_REQUEST)
+        other = make_event(capacity=5)
+        response = self.client.post(reverse('waitlist-list'), {'event': other.pk})
+        self.assertEqual(response.data['event'], ['Event has free seats'])
+
+    def test_cancel_promotes_head_of_queue(self):
+        self.join(self.users[1])
+        entry_id = self.join(self.users[2]).data['id']
+
+        self.client.force_authenticate(self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[self.registration_id]), {})
+
+        self.assertTrue(Registration.objects.filter(
+            user=self.users[1], event=self.event, status='active').exists())
+        self.assertFalse(WaitlistEntry.objects.filter(user=self.users[1]).exists())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+        self.client.force_authenticate(self.users[2])
+        response = self.client.get(reverse('waitlist-detail', args=[entry_id]))
+        self.assertEqual(response.data['position'], 1)
+
+    def test_promotion_reactivates_cancelled_registration(self):
+        self.join(self.users[1])
+        Registration.objects.create(user=self.users[1], event=self.event, status='cancelled')
+        self.client.force_authenticate(self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[self.registration_id]), {})
+        self.assertEqual(Registration.objects.get(user=self.users[1], event=self.event).status,
+                         'active')
+
+    def test_capacity_increase_promotes_in_queue_order(self):
+        for user in self.users[1:]:
+            self.join(user)
+        staff = User.objects.create_user('organizer')
+        self.client.force_authenticate(staff)
+        self.client.patch(reverse('event-detail', args=[self.event.pk]), {'capacity': 3})
+
+        promoted = set(Registration.objects.filter(event=self.event, status='active')
+                       .values_list('user__username', flat=True))
+        self.assertEqual(promoted, {'fan0', 'fan1', 'fan2'})
+        self.assertEqual(list(WaitlistEntry.objects.values_list('user__username', flat=True)), ['fan3'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 3)
+
+    def test_capacity_increase_beyond_queue_keeps_seats_free(self):
+        self.join(self.users[1])
+        self.client.patch(reverse('event-detail', args=[self.event.pk]), {'capacity': 5})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    def test_rebuild_seat_counts_promotes_into_recovered_seats(self):
+        self.join(self.users[1])
+        self.join(self.users[2])
+        Registration.objects.filter(pk=self.registration_id).update(status='cancelled')
+
+        call_command('rebuild_seat_counts', self.event.pk, stdout=StringIO())
+
+        self.assertEqual(list(Registration.objects.filter(event=self.event, status='active')
+                              .values_list('user', flat=True)), [self.users[1].pk])
+        self.assertEqual(WaitlistEntry.objects.filter(event=self.event).count(), 1)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_seats_beyond_the_queue_stay_open(self):
+        self.join(self.users[1])
+        Event.objects.filter(pk=self.event.pk).update(capacity=3)
+        self.client.force_authenticate(self.users[2])
+        response = self.client.post(reverse('registration-create'), {'event': self.event.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        response = self.join(self.users[3])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_direct_registration_waits_behind_the_queue(self):
+        self.join(self.users[1])
+        # Seat freed without promotion, e.g. a row edited by hand
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=0)
+        self.client.force_authenticate(self.users[2])
+        response = self.client.post(reverse('registration-create'), {'event': self.event.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['non_field_errors'], ['Event has a waitlist; join it instead'])
+
+    def test_cancel_with_empty_waitlist_releases_seat(self):
+        self.client.patch(reverse('registration-cancel', args=[self.registration_id]), {})
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_leave_waitlist(self):
+        entry_id = self.join(self.users[1]).data['id']
+        response = self.client.delete(reverse('waitlist-detail', args=[entry_id]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.client.force_authenticate(self.users[2])
+        self.assertEqual(self.client.get(reverse('waitlist-list')).data, [])
+
+
+class EventSearchTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.python = make_event(title='Python Conference', description='Talks about Django and asyncio')
+        self.jazz = make_event(title='Jazz Night', description='Live saxophone music',
+                               location='Abuja')
+        self.workshop = make_event(title='Cooking Workshop', description='Learn python-free recipes')
+
+    def search(self, term, **params):
+        return self.client.get(reverse('event-search'), {'q': term, **params})
+
+    def test_full_text_match_ranks_title_above_description(self):
+        results = self.search('python').data
+        self.assertEqual([item['id'] for item in results], [self.python.pk, self.workshop.pk])
+        self.assertGreater(results[0]['rank'], results[1]['rank'])
+        self.assertNotIn('search_vector', results[0])
+
+    def test_trigram_match_tolerates_typos(self):
+        results = self.search('Jaz Nite').data
+        self.assertEqual([item['id'] for item in results], [self.jazz.pk])
+
+    def test_search_vector_follows_updates(self):
+        self.jazz.description = 'Blues and soul'
+        self.jazz.save()
+        self.assertEqual(self.search('saxophone').data, [])
+        self.assertEqual([item['id'] for item in self.search('soul').data], [self.jazz.pk])
+
+    def test_limit(self):
+        self.assertEqual(len(self.search('python', limit=1).data), 1)
+
+    def test_requires_query(self):
+        self.assertEqual(self.search('').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class RegistrationListTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = User.objects.create_user('attendee', password='pass')
+        self.client.force_authenticate(self.user)
+
+    def add_registrations(self, count):
+        for i in range(count):
+            Registration.objects.create(user=self.user, event=make_event(title=f'Event {i}'))
+
+    def test_expand_embeds_event_summary(self):
+        self.add_registrations(1)
+        response = self.client.get(reverse('registration-list'), {'expand': 'event'})
+        self.assertEqual(set(response.data[0]['event']), {'id', 'title', 'date', 'location'})
+        self.assertEqual(response.data[0]['event']['title'], 'Event 0')
+
+    def test_default_mode_returns_event_ids(self):
+        self.add_registrations(1)
+        response = self.client.get(reverse('registration-list'))
+        self.assertIsInstance(response.data[0]['event'], int)
+
+    def test_expanded_query_count_is_constant(self):
+        self.add_registrations(2)
+        with self.assertNumQueries(1):
+            self.client.get(reverse('registration-list'), {'expand': 'event'})
+        self.add_registrations(20)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('registration-list'), {'expand': 'event'})
+        self.assertEqual(len(response.data), 22)
+
+    def test_str_does_not_query(self):
+        self.add_registrations(1)
+        registration = Registration.objects.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(str(registration), f'user {self.user.pk} - event {registration.event_id}')
+        registration = Registration.objects.select_related('user', 'event').get()
+        self.assertEqual(str(registration), 'attendee - Event 0')
+
+
+class AsyncReadPathTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event()
+        self.user = User.objects.create_user('async-user', password='pass')
+        Registration.objects.create(user=self.user, event=self.event)
+        self.auth = {'HTTP_AUTHORIZATION': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    def test_event_list_matches_sync_view(self):
+        sync = self.client.get(reverse('event-list'), {'page_size': 5}).json()
+        response = self.client.get(reverse('async-event-list'), {'page_size': 5})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['results'], sync['results'])
+
+    def test_event_detail_requires_token(self):
+        url = reverse('async-event-detail', args=[self.event.pk])
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(url, **self.auth)
+        self.assertEqual(response.json()['title'], 'Django Meetup')
+        response = self.client.get(reverse('async-event-detail', args=[0]), **self.auth)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_registration_list_matches_sync_view(self):
+        sync = self.client.get(reverse('registration-list'), {'expand': 'event'}, **self.auth).json()
+        response = self.client.get(reverse('async-registration-list'), {'expand': 'event'}, **self.auth)
+        self.assertEqual(response.json(), sync)
+
+    def test_invalid_filter_is_rejected(self):
+        response = self.client.get(reverse('async-event-list'), {'date_from': 'soon'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('date_from', response.json())
+
+    def test_only_get_is_allowed(self):
+        response = self.client.post(reverse('async-event-list'), {})
+        self.assertEqual(response.status_code, status.HTTP_405_METHOD_NOT_ALLOWED)
+
+
+class CachedJWTAuthenticationTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        user_cache.clear()
+        self.user = User.objects.create_user('cached', password='pass')
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def test_user_is_loaded_once(self):
+        url = reverse('registration-list')
+        with self.assertNumQueries(2):
+            self.client.get(url)
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_deactivation_evicts_cached_user(self):
+        self.client.get(reverse('registration-list'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('registration-list'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_password_change_evicts_cached_user(self):
+        self.client.get(reverse('registration-list'))
+        self.user.set_password('new-pass')
+        self.user.save()
+        self.assertIsNone(user_cache.get(self.user.pk))
+
+    def test_cache_is_bounded_and_expires(self):
+        with self.settings(EVENT_USER_CACHE_SIZE=2):
+            for pk in (1, 2, 3):
+                user_cache.set(pk, self.user)
+            self.assertIsNone(user_cache.get(1))
+            self.assertIsNotNone(user_cache.get(3))
+        with self.settings(EVENT_USER_CACHE_TTL=0):
+            user_cache.set(4, self.user)
+            self.assertIsNone(user_cache.get(4))
+
+
+class EventAvailabilityTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.events = [make_event(capacity=5) for _ in range(3)]
+        Event.objects.filter(pk=self.events[0].pk).update(seats_taken=5)
+        Event.objects.filter(pk=self.events[1].pk).update(seats_taken=2)
+
+    def test_reports_remaining_seats_in_one_query(self):
+        ids = ','.join(str(event.pk) for event in self.events)
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('event-availability'), {'ids': ids})
+        self.assertEqual([row['seats_remaining'] for row in response.data], [0, 3, 5])
+
+    def test_unknown_ids_are_skipped(self):
+        response = self.client.get(reverse('event-availability'), {'ids': f'{self.events[2].pk},0'})
+        self.assertEqual([row['id'] for row in response.data], [self.events[2].pk])
+
+    def test_rejects_bad_ids(self):
+        for ids in ('', 'a,b', ','.join(str(n) for n in range(1, 202))):
+            response = self.client.get(reverse('event-availability'), {'ids': ids})
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_event_payload_includes_seats_remaining(self):
+        response = self.client.get(reverse('event-list'))
+        self.assertEqual([row['seats_remaining'] for row in response.data['results']], [0, 3, 5])
+
+
+class AdmissionQueueTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=2, admission_queue=True)
+        self.users = [User.objects.create_user(f'rush{i}') for i in range(3)]
+
+    def register(self, user):
+        self.client.force_authenticate(user)
+        return self.client.post(reverse('registration-create'), {'event': self.event.pk})
+
+    def test_registration_is_queued(self):
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'pending')
+        self.assertFalse(Registration.objects.exists())
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+
+    def test_repeat_requests_return_the_same_ticket(self):
+        first = self.register(self.users[0]).data['id']
+        self.assertEqual(self.register(self.users[0]).data['id'], first)
+
+    def test_drain_allocates_in_arrival_order(self):
+        tickets = [self.register(user).data['id'] for user in self.users]
+        call_command('drain_admission_queue', stdout=StringIO())
+
+        statuses = [AdmissionTicket.objects.get(pk=pk).status for pk in tickets]
+        self.assertEqual(statuses, ['admitted', 'admitted', 'rejected'])
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 2)
+
+        self.client.force_authenticate(self.users[2])
+        response = self.client.get(reverse('admission-ticket-detail', args=[tickets[2]]))
+        self.assertEqual(response.data['error'], 'Event is full')
+        self.client.force_authenticate(self.users[0])
+        response = self.client.get(reverse('admission-ticket-detail', args=[tickets[0]]))
+        self.assertEqual(response.data['registration'],
+                         Registration.objects.get(user=self.users[0]).pk)
+
+    def test_drain_works_in_batches(self):
+        for user in self.users:
+            self.register(user)
+        self.assertEqual(AdmissionTicket.drain(batch_size=2), 2)
+        self.assertEqual(AdmissionTicket.objects.filter(status='pending').count(), 1)
+
+    def test_reregistering_after_a_cancel_reactivates_the_registration(self):
+        first = self.register(self.users[0]).data['id']
+        AdmissionTicket.drain()
+        registration = Registration.objects.get(user=self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[registration.pk]), {})
+
+        response = self.register(self.users[0])
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertNotEqual(response.data['id'], first)
+        self.assertEqual(response.data['status'], 'pending')
+
+        AdmissionTicket.drain()
+        ticket = AdmissionTicket.objects.get(pk=response.data['id'])
+        self.assertEqual(ticket.status, 'admitted')
+        self.assertEqual(ticket.registration_id, registration.pk)
+        registration.refresh_from_db()
+        self.assertEqual(registration.status, 'active')
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 1)
+
+    def test_reregistering_after_a_rejection_queues_again(self):
+        for user in self.users:
+            self.register(user)
+        AdmissionTicket.drain()
+        registration = Registration.objects.get(user=self.users[0])
+        self.client.force_authenticate(self.users[0])
+        self.client.patch(reverse('registration-cancel', args=[registration.pk]), {})
+
+        response = self.register(self.users[2])
+        self.assertEqual(response.data['status'], 'pending')
+        AdmissionTicket.drain()
+        self.assertEqual(AdmissionTicket.objects.get(pk=response.data['id']).status, 'admitted')
+        self.assertTrue(Registration.objects.filter(user=self.users[2], status='active').exists())
+
+    def test_tickets_are_private(self):
+        ticket = self.register(self.users[0]).data['id']
+        self.client.force_authenticate(self.users[1])
+        response = self.client.get(reverse('admission-ticket-detail', args=[ticket]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AttendeeExportTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=10)
+        self.client.force_authenticate(User.objects.create_superuser('admin', password='pass'))
+        for i in range(3):
+            user = User.objects.create_user(f'guest{i}', email=f'guest{i}@example.com')
+            Registration.objects.create(user=user, event=self.event,
+                                        status='cancelled' if i == 2 else 'active')
+
+    def export(self, fmt, **params):
+        response = self.client.get(reverse('attendee-export', args=[self.event.pk, fmt]), params)
+        return response, b''.join(response.streaming_content).decode()
+
+    def test_csv_export(self):
+        response, body = self.export('csv')
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(body.splitlines()))
+        self.assertEqual(rows[0][:3], ['registration_id', 'user_id', 'username'])
+        self.assertEqual([row[2] for row in rows[1:]], ['guest0', 'guest1'])
+
+    def test_ndjson_export_with_all_statuses(self):
+        response, body = self.export('ndjson', status='all')
+        records = [json.loads(line) for line in body.splitlines()]
+        self.assertEqual([r['email'] for r in records],
+                         ['guest0@example.com', 'guest1@example.com', 'guest2@example.com'])
+        self.assertEqual(records[2]['status'], 'cancelled')
+
+    def test_unknown_event_or_format(self):
+        self.assertEqual(self.client.get(reverse('attendee-export', args=[0, 'csv'])).status_code,
+                         status.HTTP_404_NOT_FOUND)
+        response = self.client.get(reverse('attendee-export', args=[self.event.pk, 'xml']))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(User.objects.create_user('nosy'))
+        response = self.client.get(reverse('attendee-export', args=[self.event.pk, 'csv']))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class RegistrationBenchmarkTests(TransactionTestCase):
+    def test_compare_to_baseline(self):
+        baseline = {'register': {'throughput': 100.0, 'p95_ms': 50.0, 'queries_per_request': 3.0}}
+        ok = {'register': {'throughput': 85.0, 'p95_ms': 59.0, 'queries_per_request': 3.0}}
+        worse = {'register': {'throughput': 70.0, 'p95_ms': 70.0, 'queries_per_request': 4.0}}
+        self.assertEqual(compare_to_baseline(ok, baseline, 0.2), [])
+        self.assertEqual(len(compare_to_baseline(worse, baseline, 0.2)), 3)
+
+    def test_small_run_against_baseline(self):
+        event_cache.get_cache().clear()
+        out = StringIO()
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = Path(tmp) / 'baseline.json'
+            args = ['--events', '3', '--users', '10', '--registrations', '5',
+                    '--requests', '4', '--concurrency', '2', '--baseline', str(baseline)]
+            call_command('benchmark_registrations', *args, '--save-baseline', stdout=out)
+            results = json.loads(baseline.read_text())
+            self.assertEqual(results['register']['statuses'], {'201': 4})
+            self.assertEqual(results['cancel']['statuses'], {'200': 4})
+            self.assertGreater(results['register']['queries_per_request'], 0)
+
+            results['register']['queries_per_request'] = 0.5
+            baseline.write_text(json.dumps(results))
+            with self.assertRaisesMessage(CommandError, 'register queries_per_request'):
+                call_command('benchmark_registrations', *args, stdout=out)
+
+
+class EventSoftDeleteTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.event = make_event(capacity=10)
+        self.user = User.objects.create_user('host')
+        self.client.force_authenticate(self.user)
+        for i in range(5):
+            Registration.objects.create(user=User.objects.create_user(f'guest{i}'), event=self.event)
+
+    def test_delete_hides_event_without_removing_registrations(self):
+        with self.assertNumQueries(2):
+            response = self.client.delete(reverse('event-detail', args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Registration.objects.filter(event_id=self.event.pk).count(), 5)
+        self.assertFalse(Event.objects.filter(pk=self.event.pk).exists())
+        response = self.client.get(reverse('event-detail', args=[self.event.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        response = self.client.post(reverse('registration-create'), {'event': self.event.pk})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_events_drop_out_of_my_registrations(self):
+        Registration.objects.create(user=self.user, event=self.event)
+        self.event.soft_delete()
+        self.assertEqual(self.client.get(reverse('registration-list')).data, [])
+
+    def test_deleted_events_leave_the_waitlist_alone(self):
+        registration = Registration.objects.create(user=self.user, event=self.event)
+        waiting = User.objects.create_user('waiting')
+        entry = WaitlistEntry.objects.create(user=waiting, event=self.event)
+        self.event.soft_delete()
+
+        response = self.client.patch(reverse('registration-cancel', args=[registration.pk]), {})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertTrue(WaitlistEntry.objects.filter(pk=entry.pk).exists())
+        self.assertFalse(Registration.objects.filter(user=waiting).exists())
+
+        self.client.force_authenticate(waiting)
+        self.assertEqual(self.client.get(reverse('waitlist-list')).data, [])
+        response = self.client.get(reverse('waitlist-detail', args=[entry.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_purge_removes_rows_in_batches(self):
+        WaitlistEntry.objects.create(user=self.user, event=self.event)
+        keep = make_event()
+        Registration.objects.create(user=self.user, event=keep)
+        self.event.soft_delete()
+
+        call_command('purge_deleted_events', '--batch-size', '2', stdout=StringIO())
+
+        self.assertFalse(Event.all_objects.filter(pk=self.event.pk).exists())
+        self.assertFalse(Registration.objects.filter(event_id=self.event.pk).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+        self.assertTrue(Registration.objects.filter(event=keep).exists())
+
+
+class RecurringEventTests(EventAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.first = timezone.now().replace(hour=18, minute=0, second=0, microsecond=0) + timedelta(days=1)
+        self.event = make_event(title='Yoga', capacity=1, date=self.first, recurrence='weekly')
+        self.users = [User.objects.create_user(f'yogi{i}') for i in range(2)]
+
+    def register(self, user, occurrence=None):
+        self.client.force_authenticate(user)
+        data = {'event': self.event.pk}
+        if occurrence is not None:
+            data['occurrence'] = occurrence.isoformat()
+        return self.client.post(reverse('registration-create'), data)
+
+    def test_weekly_expansion_starts_inside_the_window(self):
+        start = self.first + timedelta(days=701)
+        occurrences = list(self.event.occurrences(start, start + timedelta(days=21)))
+        self.assertEqual(len(occurrences), 3)
+        self.assertTrue(all((o - self.first) % timedelta(weeks=1) == timedelta(0) for o in occurrences))
+        self.assertGreaterEqual(occurrences[0], start)
+
+    def test_monthly_expansion_skips_short_months(self):
+        event = make_event(date=datetime(2025, 1, 31, 9, tzinfo=dt_timezone.utc), recurrence='monthly',
+                           recurrence_until=datetime(2025, 7, 1, tzinfo=dt_timezone.utc))
+        occurrences = event.occurrences(event.date, datetime(2026, 1, 1, tzinfo=dt_timezone.utc))
+        self.assertEqual([o.month for o in occurrences], [1, 3, 5])
+
+    def test_registration_is_per_occurrence(self):
+        second = self.first + timedelta(weeks=1)
+        self.assertEqual(self.register(self.users[0], second).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.register(self.users[1], second).data['non_field_errors'], ['Event is full'])
+        response = self.register(self.users[1], self.first)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(EventOccurrence.objects.filter(event=self.event).count(), 2)
+
+        self.client.force_authenticate(self.users[0])
+        registration_id = Registration.objects.get(user=self.users[0]).pk
+        self.client.patch(reverse('registration-cancel', args=[registration_id]), {})
+        self.assertEqual(EventOccurrence.objects.get(event=self.event, start=second).seats_taken, 0)
+
+    def test_rebuild_seat_counts_keeps_occurrences_apart(self):
+        self.register(self.users[0], self.first)
+        self.register(self.users[1], self.first + timedelta(weeks=1))
+        EventOccurrence.objects.filter(event=self.event).update(seats_taken=0)
+        Event.objects.filter(pk=self.event.pk).update(seats_taken=1)
+
+        call_command('rebuild_seat_counts', self.event.pk, stdout=StringIO())
+
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.seats_taken, 0)
+        self.assertEqual(list(EventOccurrence.objects.filter(event=self.event).values_list('seats_taken', flat=True)),
+                         [1, 1])
+
+    def test_occurrence_is_validated(self):
+        response = self.register(self.users[0])
+        self.assertIn('occurrence', response.data)
+        response = self.register(self.users[0], self.first + timedelta(days=1))
+        self.assertEqual(response.data['occurrence'], ['Not an occurrence of this event.'])
+        one_off = make_event()
+        response = self.client.post(reverse('registration-create'),
+                                    {'event': one_off.pk, 'occurrence': self.first.isoformat()})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_occurrences_endpoint(self):
+        self.register(self.users[0], self.first + timedelta(weeks=1))
+        response = self.client.get(reverse('event-occurrences', args=[self.event.pk]), {
+            'date_from': self.first.date().isoformat(),
+            'date_to': (self.first + timedelta(weeks=2)).date().isoformat(),
+        })
+        self.assertEqual([o['seats_remaining'] for o in response.data], [1, 0, 1])
+
+    def test_running_series_is_listed_for_later_windows(self):
+        day = (self.first + timedelta(days=90)).date().isoformat()
+        response = self.client.get(reverse('event-list'), {'date_from': day})
+        self.assertEqual([e['id'] for e in response.data['results']], [self.event.pk])
+
+    def test_running_series_pages_ahead_of_dated_events(self):
+        start = self.first + timedelta(days=90)
+        later = [make_event(title=f'Later {i}', date=start + timedelta(days=i)) for i in range(3)]
+        url = reverse('event-list') + f'?page_size=2&date_from={start.date().isoformat()}'
+        pages = []
+        while url:
+            response = self.client.get(url)
+            pages.append(response.data)
+            url = response.data['next']
+        self.assertEqual([e['id'] for page in pages for e in page['results']],
+                         [self.event.pk] + [event.pk for event in later])
+        back = self.client.get(pages[1]['previous']).data
+        self.assertEqual([e['id'] for e in back['results']], [self.event.pk, later[0].pk])
@@ -0,0 +1,206 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_BUCKETS = {
+    'user': {'rate': 1, 'burst': 10},
+    'event': {'rate': 50, 'burst': 200},
+}
+
+
+def get_bucket(scope):
+    # Tokens refill at `rate` per second up to `burst`
+    buckets = getattr(settings, 'EVENT_THROTTLE_BUCKETS', DEFAULT_BUCKETS)
+    bucket = buckets.get(scope, DEFAULT_BUCKETS[scope])
+    return bucket['rate'], bucket['burst']
+
+
+class LocalBuckets:
+    """
+    In-process token buckets, least recently used evicted past maxsize.
+
+    An evicted bucket simply starts full again next time.
+    """
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        return getattr(settings, 'EVENT_THROTTLE_LOCAL_SIZE', 100000)
+
+    def take(self, key, rate, burst, now):
+        """Take one token; returns 0 when allowed, else seconds until the next token."""
+        return self.take_all([(key, rate, burst)], now)[1]
+
+    def take_all(self, buckets, now):
+        """
+        Take one token from each (key, rate, burst) bucket, or from none.
+
+        Returns (rejected, wait): rejected is the index of the first bucket
+        without a token (None when allowed), wait the seconds until every
+        bucket has one again.
+        """
+        with self._lock:
+            states, rejected, wait = [], None, 0
+            for index, (key, rate, burst) in enumerate(buckets):
+                tokens, stamp = self._buckets.pop(key, (burst, now))
+                tokens = min(burst, tokens + (now - stamp) * rate)
+                if tokens < 1:
+                    rejected = index if rejected is None else rejected
+                    wait = max(wait, (1 - tokens) / rate)
+                states.append((key, tokens))
+            for key, tokens in states:
+                self._buckets[key] = (tokens if rejected is not None else tokens - 1, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return rejected, wait
+
+    def refund(self, buckets):
+        """Give back the tokens take_all() took for a request turned away later on."""
+        with self._lock:
+            for key, _, burst in buckets:
+                if key in self._buckets:
+                    tokens, stamp = self._buckets[key]
+                    self._buckets[key] = (min(burst, tokens + 1), stamp)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedBuckets:
+    """
+    Buckets shared between processes through a Django cache (e.g. Redis).
+
+    The cache API has no compare-and-set, so this is the counter form of a
+    bucket: at most `burst` tokens per burst/rate seconds, counted with
+    atomic incr().
+    """
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def take_all(self, buckets, now):
+        """Same contract as LocalBuckets.take_all(); counts taken before a rejection are given back."""
+        counted = []
+        for index, (key, rate, burst) in enumerate(buckets):
+            window = burst / rate
+            slot = int(now // window)
+            cache_key = f'event:throttle:{key}:{slot}'
+            self.cache.add(cache_key, 0, math.ceil(window) + 1)
+            try:
+                count = self.cache.incr(cache_key)
+            except ValueError:
+                # Evicted between add() and incr(): let this one through
+                continue
+            counted.append(cache_key)
+            if count > burst:
+                for taken in counted:
+                    try:
+                        self.cache.decr(taken)
+                    except ValueError:
+                        pass
+                return index, (slot + 1) * window - now
+        return None, 0
+
+
+class ThrottleStats:
+    """Per-process counters: a hit is a request the throttle rejected, a miss one it let through."""
+
+    def __init__(self):
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def record(self, scope, throttled):
+        with self._lock:
+            counts = self._counts.setdefault(scope, {'hits': 0, 'misses': 0})
+            counts['hits' if throttled else 'misses'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {scope: dict(counts) for scope, counts in self._counts.items()}
+
+    def clear(self):
+        with self._lock:
+            self._counts.clear()
+
+
+local_buckets = LocalBuckets()
+throttle_stats = ThrottleStats()
+
+
+def reset():
+    local_buckets.clear()
+    throttle_stats.clear()
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    Token-bucket throttle checked before the view touches the serializer or the ORM.
+
+    The in-process buckets answer first, so a client hammering one worker
+    is turned away without any I/O. With EVENT_THROTTLE_CACHE_ALIAS set,
+    requests they let through are also counted in the shared cache so the
+    limit holds across processes.
+
+    A request takes a token from every bucket in `scopes` or from none: a
+    client turned away by its own bucket does not drain the event's bucket
+    for everybody else, and is not charged for requests the event bucket
+    rejected.
+    """
+    scopes = ()
+
+    def get_user_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            return request.user.pk
+        return self.get_ident(request)
+
+    def get_event_key(self, request, view):
+        # Read straight from the request body; checked before any validation
+        event = request.data.get('event') if hasattr(request.data, 'get') else None
+        try:
+            return int(event)
+        except (TypeError, ValueError):
+            return None  # left to the serializer to reject
+
+    def allow_request(self, request, view):
+        scopes, buckets = [], []
+        for scope in self.scopes:
+            key = getattr(self, f'get_{scope}_key')(request, view)
+            if key is not None:
+                scopes.append(scope)
+                buckets.append((f'{scope}:{key}', *get_bucket(scope)))
+        if not buckets:
+            return True
+        now = time.time()
+
+        rejected, self._wait = local_buckets.take_all(buckets, now)
+        alias = getattr(settings, 'EVENT_THROTTLE_CACHE_ALIAS', None)
+        if rejected is None and alias:
+            rejected, self._wait = SharedBuckets(alias).take_all(buckets, now)
+            if rejected is not None:
+                local_buckets.refund(buckets)
+
+        # Buckets after the one that said no were never consulted
+        for index, scope in enumerate(scopes if rejected is None else scopes[:rejected + 1]):
+            throttle_stats.record(scope, throttled=index == rejected)
+        return rejected is None
+
+    def wait(self):
+        return self._wait
+
+
+class UserBucketThrottle(TokenBucketThrottle):
+    scopes = ('user',)
+
+
+class RegistrationBucketThrottle(TokenBucketThrottle):
+    # User first, so a flooding client is stopped before it reaches the event's bucket
+    scopes = ('user', 'event')
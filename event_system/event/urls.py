@@ -1,16 +1,46 @@
 from django.urls import path
+from . import async_views
 from .views import (
     EventListView,
+    EventSearchView,
+    EventAvailabilityView,
     EventDetailView,
+    AttendeeExportView,
+    EventCalendarView,
+    EventTimelineView,
+    EventOccurrenceListView,
     RegistrationListView,
+    RegistrationCalendarView,
+    RegistrationCalendarLinkView,
     RegistrationCreateView,
-    RegistrationCancelView
+    AdmissionTicketDetailView,
+    RegistrationBulkCreateView,
+    RegistrationCancelView,
+    ThrottleStatsView,
+    WaitlistListCreateView,
+    WaitlistDetailView
 )
 
 urlpatterns = [
     path('events/', EventListView.as_view(), name='event-list'),
+    path('events/search/', EventSearchView.as_view(), name='event-search'),
+    path('events/availability/', EventAvailabilityView.as_view(), name='event-availability'),
     path('events/<int:pk>/', EventDetailView.as_view(), name='event-detail'),
+    path('events/<int:pk>/occurrences/', EventOccurrenceListView.as_view(), name='event-occurrences'),
+    path('events/<int:pk>/attendees.<str:fmt>', AttendeeExportView.as_view(), name='attendee-export'),
+    path('events/<int:pk>/calendar.ics', EventCalendarView.as_view(), name='event-calendar'),
+    path('events/<int:pk>/timeline/', EventTimelineView.as_view(), name='event-timeline'),
     path('register/', RegistrationCreateView.as_view(), name='registration-create'),
+    path('admission-tickets/<int:pk>/', AdmissionTicketDetailView.as_view(), name='admission-ticket-detail'),
+    path('register/bulk/', RegistrationBulkCreateView.as_view(), name='registration-bulk-create'),
     path('my-registrations/', RegistrationListView.as_view(), name='registration-list'),
+    path('my-registrations.ics', RegistrationCalendarView.as_view(), name='registration-calendar'),
+    path('my-registrations/calendar-link/', RegistrationCalendarLinkView.as_view(), name='registration-calendar-link'),
     path('cancel-registration/<int:pk>/', RegistrationCancelView.as_view(), name='registration-cancel'),
+    path('throttle-stats/', ThrottleStatsView.as_view(), name='throttle-stats'),
+    path('waitlist/', WaitlistListCreateView.as_view(), name='waitlist-list'),
+    path('waitlist/<int:pk>/', WaitlistDetailView.as_view(), name='waitlist-detail'),
+    path('async/events/', async_views.event_list, name='async-event-list'),
+    path('async/events/<int:pk>/', async_views.event_detail, name='async-event-detail'),
+    path('async/my-registrations/', async_views.registration_list, name='async-registration-list'),
 ]
\ No newline at end of file
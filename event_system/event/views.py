@@ -1,39 +1,537 @@
+import csv
+import hashlib
+import json
+from datetime import datetime, time, timedelta
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchQuery, SearchRank, TrigramSimilarity
+from django.db import transaction
+from django.db.models import Count, F, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Greatest
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render
-from .models import Event, Registration
-from .serializers import EventSerializer, RegistrationSerializer  
-from rest_framework import generics, permissions, status
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.utils.dateparse import parse_date, parse_datetime
+from . import cache as event_cache
+from . import calendar
+from .authentication import user_cache
+from .models import AdmissionTicket, Event, EventOccurrence, Registration, RegistrationRollup, WaitlistEntry
+from .pagination import EventCursorPagination, union_branches
+from .throttling import RegistrationBucketThrottle, UserBucketThrottle, throttle_stats
+from .serializers import (
+    AdmissionTicketSerializer,
+    BulkRegistrationSerializer,
+    EventAvailabilitySerializer,
+    EventOccurrenceSerializer,
+    EventSearchSerializer,
+    EventSerializer,
+    RegistrationRollupSerializer,
+    RegistrationSerializer,
+    RegistrationWithEventSerializer,
+    WaitlistEntrySerializer,
+)
+from rest_framework import generics, permissions, status, views
+from rest_framework.exceptions import AuthenticationFailed, NotAuthenticated, ValidationError
+from rest_framework.negotiation import BaseContentNegotiation
 from rest_framework.response import Response
 
-class EventListView(generics.ListCreateAPIView):
+
+def parse_date_param(params, name, end_of_day=False):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        day = parse_date(value)
+        if day is not None:
+            parsed = datetime.combine(day, time.max if end_of_day else time.min)
+        else:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                raise ValueError
+    except ValueError:
+        raise ValidationError({name: 'Expected an ISO 8601 date or datetime.'})
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def filter_events(params):
+    # Filters line up with the (date, id) and (location, date, id) indexes
+    date_from = parse_date_param(params, 'date_from')
+    date_to = parse_date_param(params, 'date_to', end_of_day=True)
+    location = params.get('location')
+
     queryset = Event.objects.all()
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if location:
+        queryset = queryset.filter(location=location)
+    if date_from:
+        # Recurring series are listed once while they are still running. They
+        # come from the partial series index in a branch of their own, so
+        # date__gte stays an index condition on the main branch
+        series = queryset.filter(~Q(recurrence=''), date__lt=date_from).filter(
+            Q(recurrence_until__isnull=True) | Q(recurrence_until__gte=date_from))
+        queryset = queryset.filter(date__gte=date_from).union(series, all=True)
+    return queryset
+
+
+def build_validators(source, modified):
+    # Weak ETag: the same data may go out as JSON or the browsable API
+    return {'etag': 'W/' + quote_etag(hashlib.md5(source.encode()).hexdigest()),
+            'last_modified': int(modified.timestamp()) if modified else None}
+
+def not_modified(request, validators):
+    # The 304 response when the client's copy is still current, else None
+    return get_conditional_response(request._request, etag=validators['etag'],
+                                    last_modified=validators['last_modified'])
+
+def apply_validators(response, validators):
+    response['ETag'] = validators['etag']
+    if validators['last_modified'] is not None:
+        response['Last-Modified'] = http_date(validators['last_modified'])
+    # Let clients keep a copy but make them revalidate it every time
+    patch_cache_control(response, no_cache=True)
+    return response
+
+class ConditionalGetMixin:
+    """
+    Cached GET with ETag / Last-Modified validators.
+
+    The validators are stored with the cached body, so a cache hit answers
+    304 or 200 without a query. On a miss get_validators() runs one cheap
+    query first; a matching client gets its 304 before the serializer runs.
+    """
+
+    def get_cache_key(self, request, *args, **kwargs):
+        raise NotImplementedError
+
+    def get_validators(self, request, *args, **kwargs):
+        # Returns (etag source, last modified datetime), or None to skip
+        raise NotImplementedError
+
+    def get(self, request, *args, **kwargs):
+        cache = event_cache.get_cache()
+        key = self.get_cache_key(request, *args, **kwargs)
+        entry = cache.get(key)
+        if entry is None:
+            validators = self.get_validators(request, *args, **kwargs)
+            if validators is None:
+                return super().get(request, *args, **kwargs)
+            entry = build_validators(*validators)
+
+        response = not_modified(request, entry)
+        if response is None:
+            if 'data' in entry:
+                response = Response(entry['data'])
+            else:
+                response = super().get(request, *args, **kwargs)
+                cache.set(key, dict(entry, data=response.data), event_cache.get_timeout())
+        return apply_validators(response, entry)
+
+class EventListView(ConditionalGetMixin, generics.ListCreateAPIView):
     serializer_class = EventSerializer
     permission_classes = [permissions.AllowAny]
+    pagination_class = EventCursorPagination
+
+    def get_queryset(self):
+        return filter_events(self.request.query_params)
+
+    def get_validators(self, request, *args, **kwargs):
+        # Any edit bumps max(updated_at); a deletion changes the count
+        states = [branch.aggregate(last=Max('updated_at'), count=Count('id'))
+                  for branch in union_branches(self.get_queryset())]
+        count = sum(state['count'] for state in states)
+        last = max((state['last'] for state in states if state['last']), default=None)
+        source = f"{request.get_full_path()}|{count}|{last and last.isoformat()}"
+        return source, last
+
+    def get_cache_key(self, request, *args, **kwargs):
+        return event_cache.list_key(request)
+
+class EventSearchView(generics.ListAPIView):
+    serializer_class = EventSearchSerializer
+    permission_classes = [permissions.AllowAny]
+    default_limit = 20
+    max_limit = 100
 
-class EventDetailView(generics.RetrieveUpdateDestroyAPIView):   
+    def get_queryset(self):
+        params = self.request.query_params
+        term = params.get('q', '').strip()
+        if not term:
+            raise ValidationError({'q': 'This query parameter is required.'})
+        try:
+            limit = min(max(int(params.get('limit', self.default_limit)), 1), self.max_limit)
+        except ValueError:
+            raise ValidationError({'limit': 'A valid integer is required.'})
+
+        # Full-text matches use the search_vector GIN index; the trigram
+        # conditions catch typos and partial words through the gin_trgm_ops indexes
+        query = SearchQuery(term, search_type='websearch', config='english')
+        return (
+            Event.objects
+            .filter(Q(search_vector=query)
+                    | Q(title__trigram_similar=term)
+                    | Q(location__trigram_similar=term))
+            .annotate(rank=SearchRank(F('search_vector'), query)
+                      + Greatest(TrigramSimilarity('title', term),
+                                 TrigramSimilarity('location', term)))
+            .order_by('-rank', 'date', 'id')[:limit]
+        )
+
+class EventAvailabilityView(generics.ListAPIView):
+    serializer_class = EventAvailabilitySerializer
+    permission_classes = [permissions.AllowAny]
+    max_ids = 200
+
+    def get_queryset(self):
+        # Live numbers straight from the seats_taken counters: one query, never cached
+        try:
+            ids = {int(pk) for pk in self.request.query_params.get('ids', '').split(',') if pk}
+        except ValueError:
+            raise ValidationError({'ids': 'Expected a comma-separated list of event ids.'})
+        if not ids:
+            raise ValidationError({'ids': 'This query parameter is required.'})
+        if len(ids) > self.max_ids:
+            raise ValidationError({'ids': f'At most {self.max_ids} ids per request.'})
+        return Event.objects.filter(pk__in=ids).only('capacity', 'seats_taken').order_by('id')
+
+class EventOccurrenceListView(generics.GenericAPIView):
+    serializer_class = EventOccurrenceSerializer
+    permission_classes = [permissions.AllowAny]
+    default_window = timedelta(days=30)
+    max_window = timedelta(days=366)
+
+    def get(self, request, pk):
+        event = generics.get_object_or_404(Event.objects.all(), pk=pk)
+        start = parse_date_param(request.query_params, 'date_from') or timezone.now()
+        end = (parse_date_param(request.query_params, 'date_to', end_of_day=True)
+               or start + self.default_window)
+        if end - start > self.max_window:
+            raise ValidationError({'date_to': 'The window can span at most 366 days.'})
+
+        # Only occurrences somebody registered for have a row; one query for the window
+        taken = dict(EventOccurrence.objects.filter(event=event, start__range=(start, end))
+                     .values_list('start', 'seats_taken'))
+        occurrences = [
+            {'start': moment, 'seats_taken': taken.get(moment, 0),
+             'seats_remaining': max(event.capacity - taken.get(moment, 0), 0)}
+            for moment in event.occurrences(start, end)
+        ]
+        return Response(self.get_serializer(occurrences, many=True).data)
+
+class EventDetailView(ConditionalGetMixin, generics.RetrieveUpdateDestroyAPIView):
     queryset = Event.objects.all()
     serializer_class = EventSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def get_cache_key(self, request, *args, **kwargs):
+        return event_cache.detail_key(kwargs['pk'])
+
+    def get_validators(self, request, *args, **kwargs):
+        updated_at = Event.objects.filter(pk=kwargs['pk']).values_list('updated_at', flat=True).first()
+        if updated_at is None:
+            return None  # the regular 404
+        return f"{kwargs['pk']}|{updated_at.isoformat()}", updated_at
+
+    def perform_update(self, serializer):
+        old_capacity = serializer.instance.capacity
+        with transaction.atomic():
+            event = serializer.save()
+            if event.capacity > old_capacity:
+                # New seats go to the waitlist first, in queue order
+                WaitlistEntry.fill_free_seats(event.pk)
+
+    def perform_destroy(self, instance):
+        # Returns straight away; purge_deleted_events removes the
+        # registrations in small batches in the background
+        instance.soft_delete()
+
+
+class EventTimelineView(generics.GenericAPIView):
+    serializer_class = RegistrationRollupSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request, pk):
+        if not Event.objects.filter(pk=pk).exists():
+            raise Http404
+        # Reads the pre-aggregated hourly rows, never the registrations table
+        rollups = RegistrationRollup.objects.filter(event_id=pk).order_by('hour')
+        date_from = parse_date_param(request.query_params, 'date_from')
+        date_to = parse_date_param(request.query_params, 'date_to', end_of_day=True)
+        if date_from:
+            rollups = rollups.filter(hour__gte=date_from)
+        if date_to:
+            rollups = rollups.filter(hour__lte=date_to)
+        hours = self.get_serializer(rollups, many=True).data
+        return Response({
+            'event': pk,
+            'signups': sum(row['signups'] for row in hours),
+            'cancellations': sum(row['cancellations'] for row in hours),
+            'hours': hours,
+        })
+
+def active_registrations(user, expand_event=False):
+    # Filter by status='active' instead of non-existent is_cancelled
+    queryset = (Registration.objects.filter(user=user, status='active', event__deleted_at__isnull=True)
+                .select_related('occurrence'))
+    if expand_event:
+        queryset = queryset.select_related('event')
+    return queryset
+
+class Echo:
+    # Pseudo-buffer so csv.writer hands each row back instead of storing it
+    def write(self, value):
+        return value
+
+class AttendeeExportView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+    chunk_size = 2000
+    columns = ['registration_id', 'user_id', 'username', 'email', 'first_name',
+               'last_name', 'status', 'registration_date']
+    content_types = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+    def get(self, request, pk, fmt):
+        if fmt not in self.content_types:
+            raise Http404
+        if not Event.objects.filter(pk=pk).exists():
+            raise Http404
+
+        status_filter = request.query_params.get('status', 'active')
+        registrations = Registration.objects.filter(event_id=pk)
+        if status_filter != 'all':
+            registrations = registrations.filter(status=status_filter)
+        # Server-side cursor over plain tuples (auth_user joined in the same
+        # query): memory stays flat however many attendees there are
+        rows = (
+            registrations.order_by('id')
+            .values_list('id', 'user_id', 'user__username', 'user__email', 'user__first_name',
+                         'user__last_name', 'status', 'registration_date')
+            .iterator(chunk_size=self.chunk_size)
+        )
+        stream = self.stream_csv(rows) if fmt == 'csv' else self.stream_ndjson(rows)
+        response = StreamingHttpResponse(stream, content_type=self.content_types[fmt])
+        response['Content-Disposition'] = f'attachment; filename="event-{pk}-attendees.{fmt}"'
+        return response
+
+    def stream_csv(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.columns)
+        for row in rows:
+            yield writer.writerow(row[:-1] + (row[-1].isoformat(),))
+
+    def stream_ndjson(self, rows):
+        for row in rows:
+            record = dict(zip(self.columns, row))
+            record['registration_date'] = record['registration_date'].isoformat()
+            yield json.dumps(record) + '\n'
+
+class IgnoreClientContentNegotiation(BaseContentNegotiation):
+    # Feeds have one representation; calendar apps send all sorts of Accept headers
+    def select_parser(self, request, parsers):
+        return parsers[0]
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
+
+class EventCalendarView(views.APIView):
+    permission_classes = [permissions.AllowAny]
+    content_negotiation_class = IgnoreClientContentNegotiation
+
+    def get(self, request, pk):
+        event = generics.get_object_or_404(
+            Event.objects.only('title', 'description', 'location', 'date', 'recurrence',
+                               'recurrence_interval', 'recurrence_until', 'updated_at'), pk=pk)
+        validators = build_validators(f'calendar|{pk}|{event.updated_at.isoformat()}', event.updated_at)
+        response = not_modified(request, validators)
+        if response is None:
+            rrule = None
+            if event.recurrence:
+                rrule = calendar.recurrence_rule(event.recurrence, event.recurrence_interval,
+                                                 event.recurrence_until)
+            entry = calendar.vevent(f'event-{event.pk}@{request.get_host()}', event.date,
+                                    event.updated_at, event.title, event.location,
+                                    event.description, rrule)
+            response = StreamingHttpResponse(calendar.stream_calendar(event.title, [entry]),
+                                             content_type='text/calendar; charset=utf-8')
+        return apply_validators(response, validators)
+
+class RegistrationCalendarView(views.APIView):
+    """
+    The user's active registrations as an iCalendar feed.
+
+    Calendar apps subscribe with ?key= from RegistrationCalendarLinkView;
+    API clients can use their JWT instead.
+    """
+    permission_classes = [permissions.AllowAny]
+    content_negotiation_class = IgnoreClientContentNegotiation
+    chunk_size = 500
+
+    def get_user_id(self, request):
+        if request.user.is_authenticated:
+            return request.user.pk
+        key = request.query_params.get('key')
+        if not key:
+            raise NotAuthenticated()
+        payload = calendar.read_feed_key(key)
+        user = payload and self.get_feed_user(payload[0])
+        if not user or not user.is_active or not calendar.key_matches_password(payload[1], user.password):
+            raise AuthenticationFailed('Invalid calendar key.')
+        return user.pk
+
+    def get_feed_user(self, user_id):
+        # Same per-process cache as JWT auth, so polling feeds cost no extra query
+        user = user_cache.get(user_id)
+        if user is None:
+            user = User.objects.filter(pk=user_id).first()
+            if user is not None:
+                user_cache.set(user_id, user)
+        return user
+
+    def get(self, request):
+        user_id = self.get_user_id(request)
+        registrations = Registration.objects.filter(
+            user_id=user_id, user__is_active=True, status='active', event__deleted_at__isnull=True)
+
+        # Any event edit or seat change bumps max(updated_at); sign-ups and
+        # cancellations move the count or the newest id
+        state = registrations.aggregate(last=Max('event__updated_at'), count=Count('id'), newest=Max('id'))
+        last = state['last'] and state['last'].isoformat()
+        validators = build_validators(
+            f"calendar|user|{user_id}|{state['count']}|{state['newest']}|{last}", state['last'])
+        response = not_modified(request, validators)
+        if response is None:
+            # One joined query, read through a server-side cursor as the feed streams out
+            rows = (
+                registrations.order_by('event__date', 'id')
+                .values_list('id', 'event__title', 'event__location', 'event__description',
+                             'event__date', 'occurrence__start', 'event__updated_at')
+                .iterator(chunk_size=self.chunk_size)
+            )
+            host = request.get_host()
+            entries = (
+                calendar.vevent(f'registration-{pk}@{host}', occurrence or date, updated_at,
+                                title, location, description)
+                for pk, title, location, description, date, occurrence, updated_at in rows
+            )
+            response = StreamingHttpResponse(calendar.stream_calendar('My registrations', entries),
+                                             content_type='text/calendar; charset=utf-8')
+        return apply_validators(response, validators)
+
+class RegistrationCalendarLinkView(views.APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        url = request.build_absolute_uri(reverse('registration-calendar'))
+        return Response({'url': f'{url}?{urlencode({"key": calendar.feed_key(request.user.pk, request.user.password)})}'})
+
 class RegistrationListView(generics.ListAPIView):  # Changed to ListAPIView
     serializer_class = RegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
 
+    def expand_event(self):
+        return self.request.query_params.get('expand') == 'event'
+
+    def get_serializer_class(self):
+        # ?expand=event embeds an event summary so clients skip the per-event lookups
+        if self.expand_event():
+            return RegistrationWithEventSerializer
+        return RegistrationSerializer
+
     def get_queryset(self):
-        # Filter by status='active' instead of non-existent is_cancelled
-        return Registration.objects.filter(user=self.request.user, status='active')
+        return active_registrations(self.request.user, self.expand_event())
 
 class RegistrationCreateView(generics.CreateAPIView):
     serializer_class = RegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    throttle_classes = [RegistrationBucketThrottle]
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        event = serializer.validated_data['event']
+        if event.admission_queue:
+            # Flash-sale mode: queue the request and let drain_admission_queue
+            # allocate the seat, instead of contending on the event row here
+            ticket = AdmissionTicket.issue(request.user, event)
+            return Response(AdmissionTicketSerializer(ticket).data, status=status.HTTP_202_ACCEPTED)
+        self.perform_create(serializer)
+        headers = self.get_success_headers(serializer.data)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+class AdmissionTicketDetailView(generics.RetrieveAPIView):
+    serializer_class = AdmissionTicketSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return AdmissionTicket.objects.filter(user=self.request.user)
+
+class RegistrationBulkCreateView(generics.GenericAPIView):
+    serializer_class = BulkRegistrationSerializer
+    permission_classes = [permissions.IsAdminUser]
+
+    def post(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        results = serializer.save()
+        created = sum(1 for result in results if result['status'] == 'created')
+        return Response({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        })
+
 class RegistrationCancelView(generics.UpdateAPIView):
-    queryset = Registration.objects.all()
+    # Nothing to cancel, nor any waitlist to promote from, once the event is deleted
+    queryset = Registration.objects.filter(event__deleted_at__isnull=True)
     serializer_class = RegistrationSerializer
     permission_classes = [permissions.IsAuthenticated]
+    # The event isn't known without a query here, so only the user bucket applies
+    throttle_classes = [UserBucketThrottle]
 
     def perform_update(self, serializer):
         # Set status to 'cancelled' instead of non-existent is_cancelled
-        serializer.save(status='cancelled')
\ No newline at end of file
+        serializer.save(status='cancelled')
+
+class ThrottleStatsView(views.APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        # Counters are per process; scrape every worker for the full picture
+        return Response({
+            'shared_backend': getattr(settings, 'EVENT_THROTTLE_CACHE_ALIAS', None),
+            'scopes': throttle_stats.snapshot(),
+        })
+
+def waitlist_queryset(user):
+    # 1-based queue position, counted off the (event, id) index
+    ahead = WaitlistEntry.objects.filter(
+        event=OuterRef('event'), id__lte=OuterRef('pk')
+    ).order_by().values('event').annotate(n=Count('pk')).values('n')
+    return (WaitlistEntry.objects.filter(user=user, event__deleted_at__isnull=True)
+            .annotate(position=Subquery(ahead)))
+
+class WaitlistListCreateView(generics.ListCreateAPIView):
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return waitlist_queryset(self.request.user).order_by('id')
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+class WaitlistDetailView(generics.RetrieveDestroyAPIView):
+    serializer_class = WaitlistEntrySerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return waitlist_queryset(self.request.user)
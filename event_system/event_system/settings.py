@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Full-text and trigram search
     'event',  # Custom app for event management
     'rest_framework',  # Django REST Framework for API support
     'corsheaders',  # CORS headers for cross-origin requests
@@ -91,6 +92,38 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Local memory by default; set REDIS_URL to share the cache between workers.
+# Cached event responses are dropped on change only in the cache of the worker
+# that made it: with several workers they are only fresh on a shared cache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+EVENT_CACHE_ALIAS = 'default'  # Cache used for event list/detail responses
+# Seconds; on a per-process cache this also bounds how long other workers
+# serve stale list/detail bodies, seats_remaining and ETags
+EVENT_CACHE_TIMEOUT = 300 if os.environ.get('REDIS_URL') else 30
+EVENT_USER_CACHE_SIZE = 10000  # Users kept in each process by CachedJWTAuthentication
+EVENT_USER_CACHE_TTL = 60  # Seconds before another process sees a deactivation
+# Token buckets on register/ and cancel-registration/: refill `rate` tokens per second up to `burst`
+EVENT_THROTTLE_BUCKETS = {
+    'user': {'rate': 1, 'burst': 10},
+    'event': {'rate': 50, 'burst': 200},
+}
+EVENT_THROTTLE_CACHE_ALIAS = None  # Set to a shared cache alias (Redis) to enforce limits across processes
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -111,7 +144,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # Corrected path
+        'event.authentication.CachedJWTAuthentication',  # simplejwt's JWTAuthentication with a user cache
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Only authenticated users can access the API
@@ -0,0 +1,94 @@
+"""
+Daily table availability as one bitmap per table.
+
+Bit i of a table's bitmap stands for the 15-minute slot starting i * 15
+minutes after midnight; a set bit means the table is free for that slot.
+Bitmaps go out as hex strings (24 hex digits for the 96 slots of a day).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import FilteredRelation, Q
+
+from .models import Table
+
+SLOT_MINUTES = 15
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+FULL_DAY = (1 << SLOTS_PER_DAY) - 1
+
+
+def get_timeout():
+    # Short unless configured: the default cache is per process
+    return getattr(settings, 'RESTAURANT_AVAILABILITY_CACHE_TIMEOUT', 30)
+
+
+def tables_version(restaurant_id):
+    # Bumped when a table is added, changed or removed, retiring every cached day at once
+    key = f'restaurant:tables:version:{restaurant_id}'
+    version = cache.get(key)
+    if version is None:
+        version = time.time_ns()
+        cache.add(key, version, None)
+        version = cache.get(key, version)
+    return version
+
+
+def grid_key(restaurant_id, date):
+    return f'restaurant:availability:{restaurant_id}:{tables_version(restaurant_id)}:{date}'
+
+
+def invalidate_day(restaurant_id, date):
+    cache.delete(grid_key(restaurant_id, date))
+
+
+def invalidate_tables(restaurant_id):
+    try:
+        cache.incr(f'restaurant:tables:version:{restaurant_id}')
+    except ValueError:
+        pass
+
+
+def busy_mask(start_time, end_time):
+    # Every slot the reservation overlaps, including partly covered ones
+    start = (start_time.hour * 60 + start_time.minute) // SLOT_MINUTES
+    end_minutes = end_time.hour * 60 + end_time.minute + (1 if end_time.second or end_time.microsecond else 0)
+    end = -(-end_minutes // SLOT_MINUTES)
+    if end <= start:
+        return 0
+    return ((1 << end) - 1) ^ ((1 << start) - 1)
+
+
+def build_grid(restaurant_id, date):
+    """All tables of the restaurant with their free-slot bitmaps, from a single query."""
+    rows = (
+        Table.objects.filter(restaurant_id=restaurant_id)
+        .annotate(booking=FilteredRelation('reservation', condition=Q(
+            reservation__reservation_date=date,
+            reservation__status__in=['Confirmed', 'Completed'])))
+        .order_by('table_number')
+        .values_list('id', 'table_number', 'capacity', 'booking__start_time', 'booking__end_time')
+    )
+    tables = {}
+    for table_id, number, capacity, start_time, end_time in rows:
+        table = tables.setdefault(table_id, {'id': table_id, 'table_number': number,
+                                             'capacity': capacity, 'free': FULL_DAY})
+        if start_time is not None:
+            table['free'] &= ~busy_mask(start_time, end_time)
+    for table in tables.values():
+        table['free'] = f"{table['free']:0{SLOTS_PER_DAY // 4}x}"
+    return {
+        'restaurant': restaurant_id,
+        'date': date.isoformat(),
+        'slot_minutes': SLOT_MINUTES,
+        'tables': list(tables.values()),
+    }
+
+
+def get_grid(restaurant_id, date):
+    key = grid_key(restaurant_id, date)
+    grid = cache.get(key)
+    if grid is None:
+        grid = build_grid(restaurant_id, date)
+        cache.set(key, grid, get_timeout())
+    return grid
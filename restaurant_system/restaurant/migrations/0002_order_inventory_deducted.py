@@ -0,0 +1,25 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+def mark_paid_orders(apps, schema_editor):
+    # Orders already paid must not be deducted again when next saved
+    Order = apps.get_model('restaurant', 'Order')
+    Order.objects.filter(status='Paid').update(inventory_deducted=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='inventory_deducted',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_paid_orders, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0002_order_inventory_deducted'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['table', 'reservation_date', 'start_time', 'end_time'], name='reservation_table_slot_idx'),
+        ),
+    ]
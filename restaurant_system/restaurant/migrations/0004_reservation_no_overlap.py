@@ -0,0 +1,22 @@
+# Generated by Django 5.2.3 on 2026-10-18 19:15
+
+import django.contrib.postgres.constraints
+import django.contrib.postgres.fields.ranges
+from django.contrib.postgres.operations import BtreeGistExtension
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('restaurant', '0003_reservation_table_slot_idx'),
+    ]
+
+    operations = [
+        # GiST support for the plain equality on table_id
+        BtreeGistExtension(),
+        migrations.AddConstraint(
+            model_name='reservation',
+            constraint=django.contrib.postgres.constraints.ExclusionConstraint(condition=models.Q(('status__in', ['Confirmed', 'Completed'])), expressions=[('table', '='), (models.Func(models.Func(models.F('reservation_date'), models.F('start_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), models.Func(models.F('reservation_date'), models.F('end_time'), arg_joiner=' + ', output_field=models.DateTimeField(), template='(%(expressions)s)'), function='TSRANGE', output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField()), '&&')], name='reservation_no_overlap', violation_error_message='Table is not available at the requested time'),
+        ),
+    ]
@@ -1,5 +1,19 @@
-from django.db import models
-from django.db.models import F
+from django.contrib.postgres.constraints import ExclusionConstraint
+from django.contrib.postgres.fields import DateTimeRangeField, RangeOperators
+from django.db import models, transaction
+from django.db.models import Case, DateTimeField, DecimalField, F, Func, Q, Sum, Value, When
+
+
+def reservation_period():
+    # tsrange(date + start_time, date + end_time), half-open so back-to-back bookings don't clash
+    return Func(
+        Func(F('reservation_date'), F('start_time'), arg_joiner=' + ', template='(%(expressions)s)',
+             output_field=DateTimeField()),
+        Func(F('reservation_date'), F('end_time'), arg_joiner=' + ', template='(%(expressions)s)',
+             output_field=DateTimeField()),
+        function='TSRANGE',
+        output_field=DateTimeRangeField(),
+    )
 
 class Restaurant(models.Model):
     name = models.CharField(max_length=100)
@@ -40,6 +54,23 @@ class Reservation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Confirmed')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Serves the overlap checks: one table, one day, a time range
+            models.Index(fields=['table', 'reservation_date', 'start_time', 'end_time'],
+                         name='reservation_table_slot_idx'),
+        ]
+        constraints = [
+            # PostgreSQL refuses a second live booking of the same table for an
+            # overlapping period, however many requests race for it
+            ExclusionConstraint(
+                name='reservation_no_overlap',
+                expressions=[('table', RangeOperators.EQUAL), (reservation_period(), RangeOperators.OVERLAPS)],
+                condition=Q(status__in=['Confirmed', 'Completed']),
+                violation_error_message='Table is not available at the requested time',
+            ),
+        ]
+
     def __str__(self):
         return f"{self.customer_name} - {self.reservation_date} {self.start_time}"
 
@@ -78,26 +109,51 @@ class Order(models.Model):
     total_price = models.DecimalField(max_digits=10, decimal_places=2, default=0.0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
     reservation = models.ForeignKey(Reservation, null=True, blank=True, on_delete=models.SET_NULL)
+    # Set the first time the order is saved as Paid, so stock is only ever deducted once
+    inventory_deducted = models.BooleanField(default=False, editable=False)
 
     def __str__(self):
         return f"Order #{self.id} - {self.get_status_display()}"
 
     def save(self, *args, **kwargs):
-        # Calculate total price before saving
-        if not self.pk:  # New order
-            super().save(*args, **kwargs)  # Save first to get ID
-        else:
-            self.total_price = sum(item.subtotal for item in self.items.all())
-            super().save(*args, **kwargs)
-        
-        # Update inventory when order is paid
-        if self.status == 'Paid':
-            for item in self.items.all():
-                # Deduct inventory based on recipe mapping
-                for ingredient_usage in item.menu_item.ingredients.through.objects.filter(menuitem=item.menu_item):
-                    ingredient = ingredient_usage.ingredient
-                    ingredient.quantity -= ingredient_usage.quantity_used * item.quantity
-                    ingredient.save()
+        # No savepoint of its own: an outer transaction (e.g. order creation) is enough
+        with transaction.atomic(savepoint=False):
+            # Calculate total price before saving
+            if not self.pk:  # New order
+                super().save(*args, **kwargs)  # Save first to get ID
+            else:
+                self.total_price = sum(item.subtotal for item in self.items.all())
+                super().save(*args, **kwargs)
+
+            # Update inventory when order is paid
+            if self.status == 'Paid':
+                self.deduct_inventory()
+
+    def deduct_inventory(self):
+        """
+        Take the ingredients of every line out of stock, once per order.
+
+        Claims the order with a conditional UPDATE, sums the usage per
+        ingredient in one query and applies it with a single UPDATE, whatever
+        the number of lines. Returns False when the order was already deducted.
+        """
+        with transaction.atomic(savepoint=False):
+            claimed = Order.objects.filter(pk=self.pk, inventory_deducted=False).update(inventory_deducted=True)
+            if not claimed:
+                return False
+            self.inventory_deducted = True
+
+            usage = (
+                self.items.values_list('menu_item__ingredients__ingredient')
+                .annotate(amount=Sum(F('quantity') * F('menu_item__ingredients__quantity_used')))
+                .order_by()
+            )
+            amounts = {ingredient: amount for ingredient, amount in usage if ingredient is not None}
+            if amounts:
+                Inventory.objects.filter(pk__in=amounts).update(quantity=F('quantity') - Case(
+                    *[When(pk=pk, then=Value(amount)) for pk, amount in amounts.items()],
+                    output_field=DecimalField(max_digits=10, decimal_places=2)))
+        return True
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
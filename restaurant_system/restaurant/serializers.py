@@ -1,3 +1,4 @@
+from django.db import transaction
 from rest_framework import serializers
 from .models import *
 
@@ -11,17 +12,24 @@ class MenuItemSerializer(serializers.ModelSerializer):
         model = MenuItem
         fields = '__all__'
 
+class OrderItemListSerializer(serializers.ListSerializer):
+    def get_attribute(self, instance):
+        # A new order is rendered from the lines OrderSerializer.create built,
+        # not read back from the database
+        lines = getattr(self.parent, 'created_lines', None)
+        if lines is not None and instance is self.parent.instance:
+            return lines
+        return super().get_attribute(instance)
+
 class OrderItemSerializer(serializers.ModelSerializer):
     menu_item = MenuItemSerializer(read_only=True)
-    menu_item_id = serializers.PrimaryKeyRelatedField(
-        queryset=MenuItem.objects.all(),
-        source='menu_item',
-        write_only=True
-    )
+    # Plain id: OrderSerializer looks up every line's menu item in one query
+    menu_item_id = serializers.IntegerField(write_only=True)
     
     class Meta:
         model = OrderItem
         fields = ['id', 'menu_item', 'menu_item_id', 'quantity', 'subtotal']
+        list_serializer_class = OrderItemListSerializer
 
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True)
@@ -33,18 +41,66 @@ class OrderSerializer(serializers.ModelSerializer):
                   'created_at', 'total_price', 'status', 'items', 'reservation']
         read_only_fields = ['created_at', 'total_price', 'status']
 
+    def validate_items(self, items):
+        ids = {item['menu_item_id'] for item in items}
+        menu_items = MenuItem.objects.in_bulk(ids)
+        missing = sorted(ids - menu_items.keys())
+        if missing:
+            raise serializers.ValidationError(f"Invalid menu item id(s): {', '.join(map(str, missing))}")
+        for item in items:
+            item['menu_item'] = menu_items[item.pop('menu_item_id')]
+        return items
+
     def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
-        for item_data in items_data:
-            OrderItem.objects.create(order=order, **item_data)
+        # Subtotals and the total are worked out up front, so the order is
+        # saved once and all lines go in with a single bulk_create
+        # (OrderItem.save would re-save the order for every line); lines
+        # without a quantity get the model default
+        items = [OrderItem(**item) for item in validated_data.pop('items')]
+        for item in items:
+            item.subtotal = item.menu_item.price * item.quantity
+        with transaction.atomic():
+            order = Order.objects.create(total_price=sum(item.subtotal for item in items),
+                                         **validated_data)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+        self.created_lines = items
         return order
 
+class CompactOrderItemSerializer(serializers.ModelSerializer):
+    # menu_item is just the id; the menu items go out once next to the page
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'menu_item', 'quantity', 'subtotal']
+
+class CompactOrderSerializer(OrderSerializer):
+    items = CompactOrderItemSerializer(many=True, read_only=True)
+
 class TableSerializer(serializers.ModelSerializer):
     class Meta:
         model = Table
         fields = '__all__'
 
+class AvailableTableSerializer(TableSerializer):
+    spare_seats = serializers.IntegerField(read_only=True)
+
+class TableSearchSerializer(serializers.Serializer):
+    restaurant_id = serializers.IntegerField()
+    date = serializers.DateField()
+    start_time = serializers.TimeField()
+    end_time = serializers.TimeField()
+    party_size = serializers.IntegerField(min_value=1)
+
+    def validate(self, data):
+        if data['end_time'] <= data['start_time']:
+            raise serializers.ValidationError({'end_time': 'Must be after start_time.'})
+        return data
+
+class AvailabilityQuerySerializer(serializers.Serializer):
+    restaurant_id = serializers.IntegerField()
+    date = serializers.DateField()
+
 class ReservationSerializer(serializers.ModelSerializer):
     status = serializers.CharField(source='get_status_display', read_only=True)
     
@@ -52,6 +108,13 @@ class ReservationSerializer(serializers.ModelSerializer):
         model = Reservation
         fields = '__all__'
 
+    def validate(self, data):
+        start_time = data.get('start_time', getattr(self.instance, 'start_time', None))
+        end_time = data.get('end_time', getattr(self.instance, 'end_time', None))
+        if start_time and end_time and end_time <= start_time:
+            raise serializers.ValidationError({'end_time': 'Must be after start_time.'})
+        return data
+
 class InventorySerializer(serializers.ModelSerializer):
     is_low_stock = serializers.BooleanField(read_only=True)
     
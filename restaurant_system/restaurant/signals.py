@@ -0,0 +1,33 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .availability import invalidate_day, invalidate_tables
+from .models import Reservation, Table
+
+
+@receiver(post_init, sender=Reservation)
+def remember_reservation_day(sender, instance, **kwargs):
+    # A reservation moved to another day or restaurant must clear the old grid too
+    # Read from __dict__ so deferred fields are never fetched here
+    instance._loaded_day = (instance.__dict__.get('restaurant_id'), instance.__dict__.get('reservation_date'))
+
+
+@receiver([post_save, post_delete], sender=Reservation)
+def invalidate_reservation_day(sender, instance, **kwargs):
+    days = {instance._loaded_day, (instance.restaurant_id, instance.reservation_date)}
+    instance._loaded_day = (instance.restaurant_id, instance.reservation_date)
+
+    def invalidate():
+        for restaurant_id, date in days:
+            if restaurant_id is not None and date is not None:
+                invalidate_day(restaurant_id, date)
+
+    # Wait for the commit so a concurrent reader cannot re-cache the old day
+    transaction.on_commit(invalidate)
+
+
+@receiver([post_save, post_delete], sender=Table)
+def invalidate_restaurant_tables(sender, instance, **kwargs):
+    restaurant_id = instance.restaurant_id
+    transaction.on_commit(lambda: invalidate_tables(restaurant_id))
@@ -1,3 +1,353 @@
-from django.test import TestCase
+from datetime import date, time
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from .models import Inventory, MenuItem, Order, OrderItem, Recipe, Reservation, Restaurant, Table
+
+
+class RestaurantAPITestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user('waiter', password='pass')
+        self.client.force_authenticate(self.user)
+        self.restaurant = Restaurant.objects.create(name='Mama Put', address='12 Allen Avenue')
+
+
+class OrderCreationTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.menu = [
+            MenuItem.objects.create(name=f'Dish {i}', price=Decimal('2.50') * (i + 1),
+                                    restaurant=self.restaurant, category='Main Course')
+            for i in range(20)
+        ]
+
+    def place_order(self, lines):
+        return self.client.post(reverse('order-list'), {
+            'restaurant': self.restaurant.pk,
+            'customer_name': 'Ada',
+            'items': [{'menu_item_id': item.pk, 'quantity': quantity} for item, quantity in lines],
+        }, format='json')
+
+    def test_total_is_computed_once(self):
+        response = self.place_order([(self.menu[0], 2), (self.menu[1], 1)])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('10.00'))
+        self.assertEqual(response.data['items'][1]['menu_item']['name'], 'Dish 1')
+        order = Order.objects.get()
+        self.assertEqual(order.total_price, Decimal('10.00'))
+        self.assertEqual(sorted(order.items.values_list('subtotal', flat=True)),
+                         [Decimal('5.00'), Decimal('5.00')])
+
+    def test_query_count_is_independent_of_line_count(self):
+        with self.assertNumQueries(6):
+            self.place_order([(item, 1) for item in self.menu[:2]])
+        with self.assertNumQueries(6):
+            self.place_order([(item, 3) for item in self.menu])
+        self.assertEqual(OrderItem.objects.count(), 22)
+
+    def test_quantity_defaults_to_one(self):
+        response = self.client.post(reverse('order-list'), {
+            'restaurant': self.restaurant.pk,
+            'items': [{'menu_item_id': self.menu[1].pk}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['items'][0]['quantity'], 1)
+        self.assertEqual(Decimal(response.data['total_price']), Decimal('5.00'))
+        self.assertEqual(OrderItem.objects.get().quantity, 1)
+
+    def test_unknown_menu_item_creates_nothing(self):
+        response = self.client.post(reverse('order-list'), {
+            'restaurant': self.restaurant.pk,
+            'items': [{'menu_item_id': self.menu[0].pk, 'quantity': 1},
+                      {'menu_item_id': 999999, 'quantity': 1}],
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['items'], ['Invalid menu item id(s): 999999'])
+        self.assertFalse(Order.objects.exists())
+
+
+class InventoryDeductionTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.rice = Inventory.objects.create(name='Rice', quantity=Decimal('50.00'), unit='kg',
+                                             alert_threshold=Decimal('5.00'), restaurant=self.restaurant)
+        self.oil = Inventory.objects.create(name='Palm oil', quantity=Decimal('20.00'), unit='l',
+                                            alert_threshold=Decimal('2.00'), restaurant=self.restaurant)
+        self.jollof = self.dish('Jollof', rice='0.30', oil='0.05')
+        self.fried_rice = self.dish('Fried rice', rice='0.25', oil='0.10')
+        self.water = self.dish('Water')
+        self.order = Order.objects.create(restaurant=self.restaurant)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=self.order, menu_item=self.jollof, quantity=3, subtotal=0),
+            OrderItem(order=self.order, menu_item=self.fried_rice, quantity=2, subtotal=0),
+            OrderItem(order=self.order, menu_item=self.water, quantity=4, subtotal=0),
+        ])
+
+    def dish(self, name, **usage):
+        item = MenuItem.objects.create(name=name, price=Decimal('5.00'), restaurant=self.restaurant,
+                                       category='Main Course')
+        for ingredient, amount in usage.items():
+            Recipe.objects.create(menu_item=item, ingredient=getattr(self, ingredient),
+                                  quantity_used=Decimal(amount), unit='kg')
+        return item
+
+    def pay(self):
+        return self.client.post(reverse('order-update-status', args=[self.order.pk]), {'status': 'Paid'})
+
+    def assertStock(self, rice, oil):
+        self.rice.refresh_from_db()
+        self.oil.refresh_from_db()
+        self.assertEqual((self.rice.quantity, self.oil.quantity), (Decimal(rice), Decimal(oil)))
+
+    def test_paying_deducts_aggregated_usage(self):
+        self.assertEqual(self.pay().status_code, status.HTTP_200_OK)
+        # rice: 3 * 0.30 + 2 * 0.25, oil: 3 * 0.05 + 2 * 0.10
+        self.assertStock('48.60', '19.65')
+
+    def test_later_saves_do_not_deduct_again(self):
+        self.pay()
+        self.pay()
+        order = Order.objects.get()
+        order.customer_name = 'Late edit'
+        order.save()
+        self.assertStock('48.60', '19.65')
+        self.assertTrue(order.inventory_deducted)
+
+    def test_unpaid_orders_keep_stock(self):
+        self.order.status = 'Served'
+        self.order.save()
+        self.assertStock('50.00', '20.00')
+
+    def test_query_count_is_independent_of_order_size(self):
+        self.order.status = 'Paid'
+        with self.assertNumQueries(5):
+            self.order.save()
+        big = Order.objects.create(restaurant=self.restaurant)
+        OrderItem.objects.bulk_create([
+            OrderItem(order=big, menu_item=item, quantity=1, subtotal=0)
+            for item in [self.jollof, self.fried_rice, self.water] * 30
+        ])
+        big.status = 'Paid'
+        with self.assertNumQueries(5):
+            big.save()
+
+
+class TableFinderTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tables = {
+            number: Table.objects.create(table_number=number, capacity=capacity, restaurant=self.restaurant)
+            for number, capacity in [(1, 2), (2, 4), (3, 4), (4, 6), (5, 10)]
+        }
+        other = Restaurant.objects.create(name='Elsewhere', address='1 Marina')
+        Table.objects.create(table_number=99, capacity=4, restaurant=other)
+        self.day = date(2026, 12, 24)
+
+    def reserve(self, table, start, end, status='Confirmed'):
+        Reservation.objects.create(restaurant=self.restaurant, table=table, customer_name='Guest',
+                                   customer_phone='0800', reservation_date=self.day,
+                                   start_time=start, end_time=end, status=status)
+
+    def search(self, **params):
+        query = {'restaurant_id': self.restaurant.pk, 'date': self.day.isoformat(),
+                 'start_time': '19:00', 'end_time': '21:00', 'party_size': 3}
+        query.update(params)
+        return self.client.get(reverse('reservation-available-tables'), query)
+
+    def test_free_tables_ranked_by_fit_in_one_query(self):
+        self.reserve(self.tables[4], time(20, 0), time(22, 0))
+        self.reserve(self.tables[5], time(18, 0), time(19, 30), status='Cancelled')
+        with self.assertNumQueries(1):
+            response = self.search()
+        self.assertEqual([t['table_number'] for t in response.data], [2, 3, 5])
+        self.assertEqual([t['spare_seats'] for t in response.data], [1, 1, 7])
+
+    def test_back_to_back_bookings_do_not_block(self):
+        self.reserve(self.tables[1], time(17, 0), time(19, 0))
+        self.reserve(self.tables[4], time(21, 0), time(23, 0))
+        response = self.search(party_size=2)
+        self.assertEqual([t['table_number'] for t in response.data], [1, 2, 3, 4, 5])
+
+    def test_invalid_window(self):
+        response = self.search(start_time='21:00', end_time='19:00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('end_time', response.data)
+
+
+class AvailabilityGridTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.window, self.booth = [
+            Table.objects.create(table_number=number, capacity=capacity, restaurant=self.restaurant)
+            for number, capacity in [(1, 2), (2, 6)]
+        ]
+        self.day = date(2026, 12, 24)
+        self.url = reverse('reservation-availability')
+
+    def reserve(self, table, start, end, **kwargs):
+        fields = dict(restaurant=self.restaurant, table=table, customer_name='Guest',
+                      customer_phone='0800', reservation_date=self.day, start_time=start, end_time=end)
+        fields.update(kwargs)
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(**fields)
+
+    def grid(self):
+        response = self.client.get(self.url, {'restaurant_id': self.restaurant.pk, 'date': self.day.isoformat()})
+        return {table['table_number']: int(table['free'], 16) for table in response.data['tables']}
+
+    def free_slots(self, bitmap, first, last):
+        return [bool(bitmap >> slot & 1) for slot in range(first, last)]
+
+    def test_bitmaps_mark_overlapped_slots(self):
+        self.reserve(self.window, time(19, 0), time(20, 10))
+        self.reserve(self.booth, time(12, 0), time(13, 0), status='Cancelled')
+        grid = self.grid()
+        # 19:00 is slot 76; 20:10 runs into the 20:00-20:15 slot (80)
+        self.assertEqual(self.free_slots(grid[1], 75, 82), [True, False, False, False, False, False, True])
+        self.assertEqual(grid[2], (1 << 96) - 1)
+
+    def test_built_once_then_served_from_cache(self):
+        with self.assertNumQueries(1):
+            self.grid()
+        with self.assertNumQueries(0):
+            self.grid()
+
+    def test_reservation_changes_invalidate(self):
+        self.grid()
+        reservation = self.reserve(self.booth, time(8, 0), time(9, 0))
+        self.assertFalse(self.grid()[2] >> 32 & 1)
+
+        reservation.status = 'Cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        self.assertTrue(self.grid()[2] >> 32 & 1)
+
+        reservation.status = 'Confirmed'
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        self.grid()
+        reservation.reservation_date = date(2026, 12, 25)
+        with self.captureOnCommitCallbacks(execute=True):
+            reservation.save()
+        self.assertTrue(self.grid()[2] >> 32 & 1)
+
+    def test_new_table_shows_up(self):
+        self.grid()
+        with self.captureOnCommitCallbacks(execute=True):
+            Table.objects.create(table_number=3, capacity=4, restaurant=self.restaurant)
+        self.assertEqual(sorted(self.grid()), [1, 2, 3])
+
+
+class ReservationOverlapTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.table = Table.objects.create(table_number=7, capacity=4, restaurant=self.restaurant)
+        self.url = reverse('reservation-list')
+
+    def book(self, start, end, table=None):
+        return self.client.post(self.url, {
+            'restaurant': self.restaurant.pk, 'table': (table or self.table).pk,
+            'customer_name': 'Chidi', 'customer_phone': '0803',
+            'reservation_date': '2026-12-31', 'start_time': start, 'end_time': end,
+        })
+
+    def test_booking_is_a_single_insert(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.book('19:00', '21:00')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        touching = [q['sql'] for q in queries if 'restaurant_reservation' in q['sql']]
+        self.assertEqual(len(touching), 1)
+        self.assertTrue(touching[0].startswith('INSERT'))
+
+    def test_overlap_maps_to_existing_error(self):
+        self.book('19:00', '21:00')
+        response = self.book('20:30', '22:00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data, {'error': 'Table is not available at the requested time'})
+        self.assertEqual(self.book('21:00', '22:00').status_code, status.HTTP_201_CREATED)
+        other = Table.objects.create(table_number=8, capacity=4, restaurant=self.restaurant)
+        self.assertEqual(self.book('19:30', '20:00', table=other).status_code, status.HTTP_201_CREATED)
+
+    def test_cancelled_bookings_free_the_table(self):
+        self.book('19:00', '21:00')
+        Reservation.objects.update(status='Cancelled')
+        self.assertEqual(self.book('19:00', '21:00').status_code, status.HTTP_201_CREATED)
+
+    def test_moving_onto_a_taken_slot(self):
+        self.book('19:00', '21:00')
+        later = self.book('21:00', '23:00').data['id']
+        response = self.client.patch(reverse('reservation-detail', args=[later]), {'start_time': '20:00'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Reservation.objects.get(pk=later).start_time, time(21, 0))
+
+    def test_constraint_holds_outside_the_api(self):
+        self.book('19:00', '21:00')
+        clash = Reservation(restaurant=self.restaurant, table=self.table, customer_name='Race',
+                            customer_phone='0805', reservation_date=date(2026, 12, 31),
+                            start_time=time(18, 0), end_time=time(19, 30))
+        with self.assertRaisesMessage(ValidationError, 'Table is not available at the requested time'):
+            clash.full_clean()
+        with self.assertRaises(IntegrityError):
+            clash.save()
+
+    def test_end_must_follow_start(self):
+        response = self.book('21:00', '19:00')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('end_time', response.data)
+
+
+class OrderListingTests(RestaurantAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.menu = [
+            MenuItem.objects.create(name=f'Dish {i}', price=Decimal('4.00'), restaurant=self.restaurant,
+                                    category='Main Course')
+            for i in range(5)
+        ]
+        self.add_orders(10)
+
+    def add_orders(self, count):
+        orders = Order.objects.bulk_create([Order(restaurant=self.restaurant) for _ in range(count)])
+        OrderItem.objects.bulk_create([
+            OrderItem(order=order, menu_item=item, quantity=2, subtotal=Decimal('8.00'))
+            for order in orders for item in self.menu[:3]
+        ])
+
+    def test_query_count_is_independent_of_page_size(self):
+        url = reverse('order-list')
+        # count, orders, lines joined to their menu items
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(len(response.data['results']), 10)
+        self.assertEqual(response.data['results'][0]['items'][0]['menu_item']['name'], 'Dish 0')
+
+        self.add_orders(190)
+        with self.assertNumQueries(3):
+            response = self.client.get(url, {'page_size': 200})
+        self.assertEqual(len(response.data['results']), 200)
+        self.assertEqual(response.data['count'], 200)
+
+    def test_compact_sends_each_menu_item_once(self):
+        self.add_orders(190)
+        # count, orders, lines, menu items
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('order-list'), {'compact': '1', 'page_size': 200})
+        self.assertEqual([item['name'] for item in response.data['menu_items']], ['Dish 0', 'Dish 1', 'Dish 2'])
+        line = response.data['results'][0]['items'][0]
+        self.assertEqual(line['menu_item'], self.menu[0].pk)
+        self.assertEqual(set(line), {'id', 'menu_item', 'quantity', 'subtotal'})
+
+    def test_default_page_size(self):
+        self.add_orders(60)
+        response = self.client.get(reverse('order-list'))
+        self.assertEqual(len(response.data['results']), 50)
+        self.assertIsNotNone(response.data['next'])
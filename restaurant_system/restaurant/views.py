@@ -3,8 +3,11 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import *
 from .serializers import *
+from . import availability
+from .pagination import OrderPagination
+from django.db import IntegrityError, transaction
 from django.utils import timezone
-from django.db.models import Sum, Q
+from django.db.models import Exists, OuterRef, Prefetch, Sum, Q
 
 class RestaurantViewSet(viewsets.ModelViewSet):
     queryset = Restaurant.objects.all()
@@ -22,18 +25,41 @@ class MenuItemViewSet(viewsets.ModelViewSet):
 
 class OrderViewSet(viewsets.ModelViewSet):
     serializer_class = OrderSerializer
-    
+    pagination_class = OrderPagination
+
+    def is_compact(self):
+        return self.action == 'list' and self.request.query_params.get('compact') in ('1', 'true')
+
     def get_queryset(self):
         restaurant_id = self.request.query_params.get('restaurant_id')
         status = self.request.query_params.get('status')
-        
-        queryset = Order.objects.all()
+
+        # Lines come in one extra query for the whole page; in compact mode
+        # their menu items are fetched once, separately, in list()
+        items = OrderItem.objects.order_by('id')
+        if not self.is_compact():
+            items = items.select_related('menu_item')
+        queryset = Order.objects.prefetch_related(Prefetch('items', queryset=items)).order_by('-created_at', '-id')
         if restaurant_id:
             queryset = queryset.filter(restaurant_id=restaurant_id)
         if status:
             queryset = queryset.filter(status=status)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if not self.is_compact():
+            return super().list(request, *args, **kwargs)
+
+        # ?compact=1: lines reference menu items by id and each menu item
+        # is sent once per page, however many orders contain it
+        page = self.paginate_queryset(self.filter_queryset(self.get_queryset()))
+        menu_item_ids = {item.menu_item_id for order in page for item in order.items.all()}
+        menu_items = MenuItem.objects.in_bulk(menu_item_ids)
+        response = self.get_paginated_response(CompactOrderSerializer(page, many=True).data)
+        response.data['menu_items'] = MenuItemSerializer(
+            [menu_items[pk] for pk in sorted(menu_items)], many=True).data
+        return response
+
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         order = self.get_object()
@@ -45,6 +71,19 @@ class OrderViewSet(viewsets.ModelViewSet):
             return Response({'status': 'Status updated'})
         return Response({'error': 'Invalid status'}, status=status.HTTP_400_BAD_REQUEST)
 
+def is_overlap_violation(exc):
+    diag = getattr(exc.__cause__, 'diag', None)
+    return getattr(diag, 'constraint_name', None) == 'reservation_no_overlap'
+
+def overlapping_reservations(date, start_time, end_time):
+    # Reservations that block a table for any part of the window
+    return Reservation.objects.filter(
+        reservation_date=date,
+        start_time__lt=end_time,
+        end_time__gt=start_time,
+        status__in=['Confirmed', 'Completed']
+    )
+
 class ReservationViewSet(viewsets.ModelViewSet):
     serializer_class = ReservationSerializer
     
@@ -60,34 +99,59 @@ class ReservationViewSet(viewsets.ModelViewSet):
         return queryset
 
     def create(self, request, *args, **kwargs):
-        serializer = self.get_serializer(data=request.data)
-        serializer.is_valid(raise_exception=True)
-        
-        # Check table availability
-        if not self.is_table_available(
-            serializer.validated_data['table'].id,
-            serializer.validated_data['reservation_date'],
-            serializer.validated_data['start_time'],
-            serializer.validated_data['end_time']
-        ):
-            return Response(
-                {'error': 'Table is not available at the requested time'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        self.perform_create(serializer)
-        headers = self.get_success_headers(serializer.data)
-        return Response(serializer.data, status=status.HTTP_201_CREATED, headers=headers)
-    
-    def is_table_available(self, table_id, date, start_time, end_time):
-        conflicting_reservations = Reservation.objects.filter(
-            table_id=table_id,
-            reservation_date=date,
-            start_time__lt=end_time,
-            end_time__gt=start_time,
-            status__in=['Confirmed', 'Completed']
-        ).exists()
-        return not conflicting_reservations
+        # The reservation_no_overlap constraint does the availability check
+        # as part of the INSERT, so concurrent bookings cannot both succeed
+        try:
+            with transaction.atomic():
+                return super().create(request, *args, **kwargs)
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            return self.table_unavailable()
+
+    def update(self, request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return super().update(request, *args, **kwargs)
+        except IntegrityError as exc:
+            if not is_overlap_violation(exc):
+                raise
+            return self.table_unavailable()
+
+    def table_unavailable(self):
+        return Response(
+            {'error': 'Table is not available at the requested time'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    @action(detail=False, methods=['get'])
+    def available_tables(self, request):
+        params = TableSearchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        search = params.validated_data
+
+        # One query: NOT EXISTS against the (table, date, start, end) index,
+        # smallest table that still seats the party first
+        busy = overlapping_reservations(
+            search['date'], search['start_time'], search['end_time']
+        ).filter(table=OuterRef('pk'))
+        tables = Table.objects.filter(
+            restaurant_id=search['restaurant_id'],
+            capacity__gte=search['party_size']
+        ).filter(~Exists(busy)).annotate(
+            spare_seats=F('capacity') - search['party_size']
+        ).order_by('capacity', 'table_number')
+
+        serializer = AvailableTableSerializer(tables, many=True)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['get'])
+    def availability(self, request):
+        # Whole day for every table in one response; see availability.py for the bitmap layout
+        params = AvailabilityQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        return Response(availability.get_grid(params.validated_data['restaurant_id'],
+                                              params.validated_data['date']))
 
 class InventoryViewSet(viewsets.ModelViewSet):
     serializer_class = InventorySerializer
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -37,6 +38,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',  # Range fields and exclusion constraints
     'restaurant',
     'rest_framework',  # Django REST Framework for API support
     'corsheaders',  # CORS headers for cross-origin requests
@@ -129,6 +131,26 @@ STATIC_URL = 'static/'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# Local memory by default; set REDIS_URL to share the cache between workers.
+# Availability grids are dropped whenever a reservation or table changes, but
+# only in the cache of the worker that made the change: with several workers
+# the grids are only correct on a shared cache.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Seconds; on a per-process cache this bounds how long other workers serve a stale grid
+RESTAURANT_AVAILABILITY_CACHE_TIMEOUT = 3600 if os.environ.get('REDIS_URL') else 30
+
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',